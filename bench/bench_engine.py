@@ -0,0 +1,259 @@
+"""
+Benchmarks for the hot paths of the Blokus game engine.
+
+Each benchmark is run on the mini, mono, duo and classic configurations
+of game_types.blockus_games, on a mid-game position reached by a seeded
+random game, and the results are written as JSON so that runs from two
+commits can be diffed (or compared directly with --compare).
+
+Run from the repository root:
+
+    python3 bench/bench_engine.py -o bench_output.json
+    python3 bench/bench_engine.py --compare bench_output.json
+"""
+
+import json
+import platform
+import random
+import subprocess
+import sys
+import time
+from pathlib import Path
+from typing import Any, Callable, Optional
+
+import click
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "src"))
+
+from blokus import Blokus
+from bot import NBot
+from game_types import blockus_games
+from piece import Piece
+
+try:
+    from batch import BlokusBatch
+    HAS_NUMPY = True
+except ImportError:
+    # The batched engine needs NumPy
+    HAS_NUMPY = False
+
+# Results of one benchmark: timings in microseconds per call
+Result = dict[str, float]
+
+CONFIGS = ["mini", "mono", "duo", "classic"]
+
+# Number of games played in lockstep by the batch benchmark
+BATCH_GAMES = 256
+
+
+def new_game(config: str) -> Blokus:
+    """
+    Builds a game with the given configuration of blockus_games.
+    Configurations without a number of players get one player per
+    start position.
+    """
+    game_type = blockus_games[config]
+    start_positions = game_type["start_positions"]
+    assert isinstance(start_positions, set)
+    size = game_type["size"]
+    assert isinstance(size, int)
+    num_players = game_type.get("num_players", len(start_positions))
+    assert isinstance(num_players, int)
+    return Blokus(num_players, size, set(start_positions))
+
+
+def play_random(game: Blokus, rng: random.Random,
+                max_moves: Optional[int] = None) -> list[Piece]:
+    """
+    Plays random legal moves (retiring players that have none) until the
+    game is over or max_moves pieces have been placed.
+
+    Returns, the list of placed pieces
+    """
+    placed: list[Piece] = []
+    while not game.game_over and (max_moves is None or len(placed) < max_moves):
+        moves = sorted(game.legal_moves())
+        if not moves:
+            game.retire()
+            continue
+        move = rng.choice(moves)
+        piece = move.to_piece(game.shapes[move.kind])
+        game.maybe_place(piece)
+        placed.append(piece)
+    return placed
+
+
+def measure(func: Callable[[], Any], calls_per_run: int = 1,
+            min_time: float = 0.2, repeat: int = 5) -> Result:
+    """
+    Times func, which makes calls_per_run calls of the code being
+    measured. func is run in a loop for at least min_time seconds,
+    repeat times over.
+
+    Returns, the best and mean time per call, in microseconds
+    """
+    per_call: list[float] = []
+    for _ in range(repeat):
+        runs = 0
+        start = time.perf_counter()
+        elapsed = 0.0
+        while elapsed < min_time or runs == 0:
+            func()
+            runs += 1
+            elapsed = time.perf_counter() - start
+        per_call.append(elapsed / (runs * calls_per_run) * 1e6)
+    return {"best_us": min(per_call), "mean_us": sum(per_call) / len(per_call)}
+
+
+def bench_config(config: str, seed: int, min_time: float,
+                 repeat: int) -> dict[str, Result]:
+    """
+    Runs every benchmark on one configuration. The batch benchmark is
+    skipped if NumPy is not installed.
+    """
+    results: dict[str, Result] = {}
+
+    # A complete seeded game, and the position halfway through it
+    full_game = new_game(config)
+    pieces = play_random(full_game, random.Random(seed))
+    game = new_game(config)
+    play_random(game, random.Random(seed), max_moves=len(pieces) // 2)
+
+    results["available_moves"] = measure(
+        game.available_moves, min_time=min_time, repeat=repeat)
+    results["legal_moves"] = measure(
+        game.legal_moves, min_time=min_time, repeat=repeat)
+
+    # Every orientation of every remaining shape near the open corners,
+    # legal or not
+    candidates = []
+    cells = sorted(game.corners(game.curr_player)) or sorted(game.start_positions)
+    for kind in game.remaining_shapes(game.curr_player):
+        for face_up, rotation in [(True, 0), (False, 1)]:
+            for cell in cells[:4]:
+                piece = Piece(game.shapes[kind], face_up, rotation)
+                piece.set_anchor(cell)
+                candidates.append(piece)
+
+    def check_all() -> None:
+        for piece in candidates:
+            game.legal_to_place(piece)
+    if candidates:
+        results["legal_to_place"] = measure(
+            check_all, len(candidates), min_time=min_time, repeat=repeat)
+
+    def replay() -> None:
+        replayed = new_game(config)
+        for piece in pieces:
+            replayed.maybe_place(piece)
+    construct = measure(lambda: new_game(config), min_time=min_time,
+                        repeat=repeat)
+    if pieces:
+        placed = measure(replay, len(pieces), min_time=min_time, repeat=repeat)
+        overhead = construct["best_us"] / len(pieces)
+        results["maybe_place"] = {key: max(0.0, value - overhead)
+                                  for key, value in placed.items()}
+    results["construct"] = construct
+
+    results["game_over"] = measure(lambda: game.game_over,
+                                   min_time=min_time, repeat=repeat)
+    results["winners"] = measure(lambda: full_game.winners,
+                                 min_time=min_time, repeat=repeat)
+
+    def nbot_game() -> None:
+        played = new_game(config)
+        # One bot per player, each moving for its own player
+        bots = [NBot(bot_id=i + 1, rng=random.Random(seed + i))
+                for i in range(played.num_players)]
+        while not played.game_over:
+            piece = bots[played.curr_player - 1].make_move(played)
+            if piece:
+                played.maybe_place(piece)
+            else:
+                played.retire()
+    results["nbot_game"] = measure(nbot_game, min_time=min_time, repeat=1)
+
+    # Random games played in lockstep, timed per ply across the batch
+    if HAS_NUMPY:
+        def batch_games() -> int:
+            batch = BlokusBatch(BATCH_GAMES, game.num_players, game.size,
+                                game.start_positions)
+            return batch.play_random(random.Random(seed))
+        plies = batch_games()
+        ply = measure(batch_games, plies, min_time=min_time, repeat=1)
+        ply["plies_per_second"] = 1e6 / ply["best_us"]
+        results["batch_ply"] = ply
+
+    return results
+
+
+def git_commit() -> Optional[str]:
+    """
+    Returns the commit being benchmarked, if run from a git checkout.
+    """
+    try:
+        out = subprocess.run(["git", "rev-parse", "--short", "HEAD"],
+                             capture_output=True, text=True, check=True,
+                             cwd=Path(__file__).resolve().parent)
+    except (OSError, subprocess.CalledProcessError):
+        return None
+    return out.stdout.strip()
+
+
+def compare(old: dict[str, Any], new: dict[str, Any]) -> None:
+    """
+    Prints the ratio of new to old best times for every benchmark
+    present in both runs (above 1.00 means slower).
+    """
+    print(f"{'benchmark':<28} {'old us':>12} {'new us':>12} {'ratio':>7}")
+    for config, benches in new["results"].items():
+        for name, result in benches.items():
+            before = old["results"].get(config, {}).get(name)
+            if before is None:
+                continue
+            ratio = result["best_us"] / before["best_us"] \
+                if before["best_us"] else float("inf")
+            print(f"{config + '.' + name:<28} {before['best_us']:>12.1f} "
+                  f"{result['best_us']:>12.1f} {ratio:>7.2f}")
+
+
+@click.command()
+@click.option('-c', '--config', 'configs', multiple=True,
+              type=click.Choice(CONFIGS), help='Configuration to benchmark '
+              '(may be given several times; all of them by default).')
+@click.option('-o', '--output', type=click.Path(dir_okay=False),
+              help='File to write the JSON results to (stdout by default).')
+@click.option('--compare', 'baseline', type=click.Path(exists=True),
+              help='JSON results of an earlier run to compare against.')
+@click.option('--seed', default=14200, type=int,
+              help='Seed of the random games the positions come from.')
+@click.option('--min-time', default=0.2, type=float,
+              help='Minimum time, in seconds, of each timed run.')
+@click.option('--repeat', default=5, type=int,
+              help='Number of timed runs of each benchmark.')
+def main(configs: tuple[str, ...], output: Optional[str],
+         baseline: Optional[str], seed: int, min_time: float,
+         repeat: int) -> None:
+    """
+    Run the engine benchmarks and report the results as JSON
+    """
+    report = {
+        "commit": git_commit(),
+        "python": platform.python_version(),
+        "seed": seed,
+        "results": {config: bench_config(config, seed, min_time, repeat)
+                    for config in (configs or CONFIGS)},
+    }
+
+    text = json.dumps(report, indent=2, sort_keys=True)
+    if output:
+        Path(output).write_text(text + "\n")
+    elif not baseline:
+        print(text)
+
+    if baseline:
+        compare(json.loads(Path(baseline).read_text()), report)
+
+
+if __name__ == "__main__":
+    main()
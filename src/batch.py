@@ -0,0 +1,272 @@
+"""
+Batched Blokus engine: many games of the same configuration stepped in
+lockstep with NumPy.
+
+The boards of all N games are held in one (N x size x size) uint8 array
+of player numbers (0 for an empty cell), and the rest of the state
+(player to move, shapes used, retired players, scores...) in arrays
+with one row per game. legal_masks finds the legal moves of every game
+in one pass of sliding-window sums per orientation (see numpy_masks.py),
+and step applies one move per game.
+
+A move is encoded as one int, the index of a cell of the
+(NUM_ORIENTATIONS x size x size) legality mask of its game:
+
+    action = (k * size + r) * size + c
+
+where k indexes ORIENTATION_LIST, the orientations of all shapes in
+order, and (r, c) is the top-left corner of the orientation's bounding
+box. RETIRE (-1) makes the player to move retire.
+
+The rules are those of the Blokus class, so a game of the batch can be
+replayed move for move on a Blokus (see to_move).
+"""
+
+import random
+from typing import Optional
+
+import numpy as np
+import numpy.typing as npt
+
+from shape_definitions import ShapeKind
+from piece import Point
+from orientations import (ORIENTATIONS, NUM_ORIENTATIONS, KINDS,
+                          ORIENTATION_LIST)
+from move import Move
+from numpy_masks import STENCILS, window_sums
+
+RETIRE = -1
+
+# Index in KINDS of the shape of each orientation
+_KIND_INDEX = np.array([KINDS.index(kind) for kind, _ in ORIENTATION_LIST])
+
+# Number of squares of each shape, in the order of KINDS
+_SHAPE_SIZES = np.array([len(ORIENTATIONS[kind][0]) for kind in KINDS])
+
+# Squares of each orientation relative to the top-left corner of its
+# bounding box, padded to five squares by repeating the first one
+_SQUARES = np.array([
+    [squares[min(i, len(squares) - 1)] for i in range(5)]
+    for squares in (STENCILS[kind][j].squares for kind, j in ORIENTATION_LIST)
+])
+
+_TOTAL_SQUARES = int(_SHAPE_SIZES.sum())
+
+
+class BlokusBatch:
+    """
+    num_games games of Blokus, with the same number of players, board
+    size and start positions, played in lockstep (see the module
+    docstring).
+    """
+
+    def __init__(self, num_games: int, num_players: int, size: int,
+                 start_positions: set[Point]) -> None:
+        """
+        Constructor
+
+        Raises ValueError for the same invalid configurations as Blokus,
+        or if num_games is not positive.
+        """
+        if num_games <= 0:
+            raise ValueError("Invalid number of games")
+        if num_players <= 0:
+            raise ValueError("Invalid number of players")
+        if size < 5:
+            raise ValueError("Invalid board size")
+        if len(start_positions) < num_players:
+            raise ValueError("Not enough starting positions for the number of players")
+
+        self.num_games = num_games
+        self.num_players = num_players
+        self.size = size
+        self.start_positions = set(start_positions)
+
+        n, p = num_games, num_players + 1
+        self.boards = np.zeros((n, size, size), dtype=np.uint8)
+        self.curr_player = np.ones(n, dtype=np.int64)
+        self.num_moves = np.zeros(n, dtype=np.int64)
+        # used[g, player, i] is True once player has played KINDS[i]
+        self.used = np.zeros((n, p, len(KINDS)), dtype=bool)
+        self.retired = np.zeros((n, p), dtype=bool)
+        # Players who have neither retired nor played all their pieces;
+        # column 0 is unused
+        self.active = np.ones((n, p), dtype=bool)
+        self.active[:, 0] = False
+        self.scores = np.full((n, p), -_TOTAL_SQUARES, dtype=np.int64)
+        self.empty_cells = np.full(n, size * size, dtype=np.int64)
+
+        self._start = np.zeros((size + 2, size + 2), dtype=np.uint8)
+        for r, c in start_positions:
+            if 0 <= r < size and 0 <= c < size:
+                self._start[r + 1, c + 1] = 1
+
+        # Masks returned by the last call to legal_masks, used by step
+        self._legal: Optional[np.ndarray] = None
+
+    @property
+    def done(self) -> np.ndarray:
+        """
+        Returns a boolean array telling which games are over: those with
+        no active player left, or a full board.
+        """
+        return ~self.active.any(axis=1) | (self.empty_cells == 0)
+
+    def legal_masks(self) -> np.ndarray:
+        """
+        Computes the legal moves of the player to move in every game.
+
+        Returns, a (num_games x NUM_ORIENTATIONS x size x size) boolean
+        array, True at the moves that are legal (see the module
+        docstring); all False for games that are over
+        """
+        size = self.size
+        # Only the games that are not over are scanned
+        games = np.flatnonzero(~self.done)
+        boards = self.boards[games]
+        players = self.curr_player[games]
+        occupied = np.pad(boards != 0, ((0, 0), (1, 1), (1, 1)))
+        occupied = occupied.astype(np.uint8)
+        own = np.pad(boards == players[:, None, None], ((0, 0), (1, 1), (1, 1)))
+        own = own.astype(np.uint8)
+        opening = (self.num_moves[games] < self.num_players)[:, None, None]
+        any_opening = bool(opening.any())
+        any_later = not opening.all()
+
+        legal = np.zeros((self.num_games, NUM_ORIENTATIONS, size, size),
+                         dtype=bool)
+        if len(games) == 0:
+            self._legal = legal
+            return legal
+
+        found = np.zeros((len(games), NUM_ORIENTATIONS, size, size), dtype=bool)
+        for k, (kind, j) in enumerate(ORIENTATION_LIST):
+            stencil = STENCILS[kind][j]
+            rows = size - stencil.height + 1
+            cols = size - stencil.width + 1
+            if rows <= 0 or cols <= 0:
+                continue
+            fits = ((window_sums(occupied, stencil.squares, rows, cols) == 0)
+                    & (window_sums(own, stencil.edges, rows, cols) == 0))
+            # The start positions are the same in every game
+            if any_opening and any_later:
+                on_start = window_sums(self._start, stencil.squares, rows, cols) == 1
+                touching = window_sums(own, stencil.corners, rows, cols) > 0
+                fits &= np.where(opening, on_start, touching)
+            elif any_opening:
+                fits &= window_sums(self._start, stencil.squares, rows, cols) == 1
+            else:
+                fits &= window_sums(own, stencil.corners, rows, cols) > 0
+            found[:, k, :rows, :cols] = fits
+
+        used = self.used[games, players][:, _KIND_INDEX]
+        legal[games] = found & ~used[:, :, None, None]
+        self._legal = legal
+        return legal
+
+    def sample_moves(self, rng: random.Random) -> np.ndarray:
+        """
+        Picks a uniformly random legal move in every game, or RETIRE if
+        the player to move has none (or the game is over).
+
+        Returns, an int array of num_games actions
+        """
+        legal = self.legal_masks().reshape(self.num_games, -1)
+        actions = np.full(self.num_games, RETIRE, dtype=np.int64)
+        for g in range(self.num_games):
+            choices = np.flatnonzero(legal[g])
+            if len(choices):
+                actions[g] = choices[rng.randrange(len(choices))]
+        return actions
+
+    def step(self, actions: npt.ArrayLike) -> np.ndarray:
+        """
+        Plays one move in every game that is not over: a piece for a
+        non-negative action, or a retirement for RETIRE. Actions of
+        games that are over are ignored.
+
+        Raises ValueError if a piece cannot be legally placed.
+
+        Returns, the boolean array of games that are over
+        """
+        actions = np.asarray(actions, dtype=np.int64)
+        if actions.shape != (self.num_games,):
+            raise ValueError("Expected one action per game")
+        if self._legal is None:
+            self.legal_masks()
+        assert self._legal is not None
+
+        live = ~self.done
+        place = live & (actions != RETIRE)
+        retire = live & (actions == RETIRE)
+        games = np.flatnonzero(place)
+        moves = actions[games]
+        legal = self._legal.reshape(self.num_games, -1)
+        if ((moves < 0) | (moves >= legal.shape[1])).any() \
+                or not legal[games, moves].all():
+            raise ValueError("Illegal move")
+
+        players = self.curr_player.copy()
+        nxt = players % self.num_players + 1
+
+        # Pieces
+        k, cell = np.divmod(moves, self.size * self.size)
+        r, c = np.divmod(cell, self.size)
+        squares = _SQUARES[k]
+        self.boards[games[:, None], r[:, None] + squares[:, :, 0],
+                    c[:, None] + squares[:, :, 1]] = players[games, None]
+        kinds = _KIND_INDEX[k]
+        self.used[games, players[games], kinds] = True
+        sizes = _SHAPE_SIZES[kinds]
+        self.empty_cells[games] -= sizes
+        self.scores[games, players[games]] += sizes
+        finished = self.used[games, players[games]].all(axis=1)
+        done_games = games[finished]
+        self.active[done_games, players[done_games]] = False
+        self.scores[done_games, players[done_games]] = np.where(
+            kinds[finished] == KINDS.index(ShapeKind.ONE), 20, 15)
+        self.curr_player[games] = np.where(self.retired[games, nxt[games]],
+                                           players[games], nxt[games])
+        self.num_moves[games] += 1
+
+        # Retirements
+        games = np.flatnonzero(retire)
+        self.retired[games, players[games]] = True
+        self.active[games, players[games]] = False
+        self.curr_player[games] = nxt[games]
+
+        self._legal = None
+        return self.done
+
+    def winners(self, game: int) -> list[int]:
+        """
+        Returns the players with the highest score in the given game.
+        """
+        scores = self.scores[game, 1:]
+        return [int(p) + 1 for p in np.flatnonzero(scores == scores.max())]
+
+    def to_move(self, action: int) -> Optional[Move]:
+        """
+        Returns the Move of the given action, or None for RETIRE.
+        """
+        if action == RETIRE:
+            return None
+        k, cell = divmod(int(action), self.size * self.size)
+        r, c = divmod(cell, self.size)
+        kind, j = ORIENTATION_LIST[k]
+        dr, dc = STENCILS[kind][j].origin
+        return Move(kind, j, (r - dr, c - dc))
+
+    def play_random(self, rng: random.Random) -> int:
+        """
+        Plays uniformly random moves in every game until all of them are
+        over.
+
+        Returns, the total number of plies (moves and retirements)
+        played across the batch
+        """
+        plies = 0
+        while not self.done.all():
+            plies += int((~self.done).sum())
+            self.step(self.sample_moves(rng))
+        return plies
@@ -0,0 +1,438 @@
+"""
+Bitboard implementation of BlokusBase.
+
+The board is stored as Python integers used as bit masks, with one bit
+per cell (bit r * size + c for the cell at row r and column c): one mask
+per player plus a mask of all occupied cells. Every placement of every
+orientation (see orientations.py) is precomputed, for each board size,
+as three masks: the squares it covers, the cells along its edges, and
+the cells touching its corners. Checking a placement for overlap, edge
+adjacency and corner contact then only takes a few bitwise ANDs.
+
+The rules are the same as those of the Blokus class in blokus.py, so
+both engines can be used interchangeably by the TUI, GUI and bots.
+"""
+
+from typing import Optional, Callable
+
+from shape_definitions import ShapeKind
+from piece import Point, Shape, Piece, shape_registry
+from base import BlokusBase, Grid
+from orientations import ORIENTATIONS
+from move import Move
+
+# The three masks of a placement: its squares, edges and corners
+Masks = tuple[int, int, int]
+
+# Placement masks, per board size, for every orientation of every shape:
+# _PLACEMENTS[size][kind][orientation] maps an anchor to its Masks
+_PLACEMENTS: dict[int, dict[ShapeKind, list[dict[Point, Masks]]]] = {}
+
+
+def placement_masks(size: int, squares: list[Point]) -> Optional[Masks]:
+    """
+    Computes the masks of a piece covering the given squares on a
+    (size x size) board.
+
+    Inputs:
+        size, an int
+        squares, a list of Points
+
+    Returns, the Masks of the placement, or None if one of the
+    squares is off the board
+    """
+    cover = 0
+    for r, c in squares:
+        if not (0 <= r < size and 0 <= c < size):
+            return None
+        cover |= 1 << (r * size + c)
+
+    edges = 0
+    corners = 0
+    for r, c in squares:
+        for dr, dc in ((-1, 0), (1, 0), (0, -1), (0, 1)):
+            nr, nc = r + dr, c + dc
+            if 0 <= nr < size and 0 <= nc < size:
+                edges |= 1 << (nr * size + nc)
+        for dr, dc in ((-1, -1), (-1, 1), (1, -1), (1, 1)):
+            nr, nc = r + dr, c + dc
+            if 0 <= nr < size and 0 <= nc < size:
+                corners |= 1 << (nr * size + nc)
+
+    edges &= ~cover
+    corners &= ~(cover | edges)
+    return cover, edges, corners
+
+
+def placements(size: int) -> dict[ShapeKind, list[dict[Point, Masks]]]:
+    """
+    Returns the precomputed placement masks for a (size x size) board,
+    building them the first time a given size is requested.
+    """
+    if size not in _PLACEMENTS:
+        table: dict[ShapeKind, list[dict[Point, Masks]]] = {}
+        for kind, orientations in ORIENTATIONS.items():
+            table[kind] = []
+            for offsets in orientations:
+                by_anchor: dict[Point, Masks] = {}
+                for r in range(size):
+                    for c in range(size):
+                        masks = placement_masks(
+                            size, [(r + dr, c + dc) for dr, dc in offsets])
+                        if masks is not None:
+                            by_anchor[(r, c)] = masks
+                table[kind].append(by_anchor)
+        _PLACEMENTS[size] = table
+    return _PLACEMENTS[size]
+
+
+def bits(mask: int) -> list[int]:
+    """
+    Returns the indices of the set bits of a mask.
+    """
+    indices = []
+    while mask:
+        low = mask & -mask
+        indices.append(low.bit_length() - 1)
+        mask ^= low
+    return indices
+
+
+class BlokusBitboard(BlokusBase):
+    """
+    Bitboard-backed Blokus game (see the module docstring)
+    """
+    def __init__(self, num_player: int, size: int,
+                 start_positions: set[Point]) -> None:
+        """
+        See BlokusBase
+        """
+        super().__init__(num_player, size, start_positions)
+
+        if self.num_players == 0:
+            raise ValueError("Invalid number of players")
+
+        if self.size < 5:
+            raise ValueError("Invalid board size")
+
+        if len(self.start_positions) < self.num_players:
+            raise ValueError("Not enough starting positions for the number of players")
+
+        for start in self.start_positions:
+            r, c = start
+            check: Callable = lambda x: x < self.size-1 or x > 0
+            if not (check(r) or check(c)):
+                raise ValueError("Invalid starting positions")
+
+        self._shapes = shape_registry()
+        self._game_shapes: Optional[dict[ShapeKind, Shape]] = None
+        self._placements = placements(size)
+        self._curr_player: int = 1
+        self._num_moves: int = 0
+        self._retired_players: set[int] = set()
+        self.curr_shape: Optional[str] = None
+        self.curr_piece: Optional[Piece] = None
+
+        self._full: int = (1 << (size * size)) - 1
+        # Masks of all cells except those in the first (last) column,
+        # used to keep horizontal shifts from wrapping around rows
+        self._not_first_col: int = self._full
+        self._not_last_col: int = self._full
+        for r in range(size):
+            self._not_first_col &= ~(1 << (r * size))
+            self._not_last_col &= ~(1 << (r * size + size - 1))
+        self._occupied: int = 0
+        self._player_masks: dict[int, int] = {i+1: 0
+                                for i in range(self.num_players)}
+        self._corner_masks: dict[int, int] = {i+1: 0
+                                for i in range(self.num_players)}
+        self._start_mask: int = 0
+        for r, c in self.start_positions:
+            if 0 <= r < size and 0 <= c < size:
+                self._start_mask |= 1 << (r * size + c)
+
+        self.player_used_shapes: dict[int, list[ShapeKind]] = {i+1: []
+                                for i in range(self.num_players)}
+
+        # Players who have neither retired nor played all their pieces
+        self._active_players: set[int] = {i+1
+                                for i in range(self.num_players)}
+
+        # Every placement made so far, used to build the grid view
+        self._history: list[tuple[int, ShapeKind, int]] = []
+        self._grid_view: Optional[Grid] = None
+
+    #
+    # PROPERTIES
+    #
+
+    @property
+    def shapes(self) -> dict[ShapeKind, Shape]:
+        """
+        See BlokusBase
+
+        See shape_definitions.py for more details. Each game has its own
+        copies of the shapes, made the first time they are asked for,
+        so they can be flipped and rotated in place without affecting
+        other games. The engine itself only reads the frozen shapes of
+        the process-wide registry (see piece.shape_registry), so the
+        moves it finds do not depend on how these copies are oriented.
+        """
+        if self._game_shapes is None:
+            self._game_shapes = {kind: shape.copy()
+                                 for kind, shape in self._shapes.items()}
+        return self._game_shapes
+
+    @property
+    def size(self) -> int:
+        """
+        See BlokusBase
+        """
+        return self._size
+
+    @property
+    def start_positions(self) -> set[Point]:
+        """
+        See BlokusBase
+        """
+        return self._start_positions
+
+    @property
+    def num_players(self) -> int:
+        """
+        See BlokusBase
+        """
+        return self._num_players
+
+    @property
+    def curr_player(self) -> int:
+        """
+        See BlokusBase
+        """
+        return self._curr_player
+
+    @property
+    def retired_players(self) -> set[int]:
+        """
+        See BlokusBase
+        """
+        return self._retired_players
+
+    @property
+    def num_moves(self) -> int:
+        return self._num_moves
+
+    @property
+    def grid(self) -> Grid:
+        """
+        See BlokusBase
+
+        The grid is only built from the bit masks when it is asked for,
+        and then reused until the next piece is placed.
+        """
+        if self._grid_view is None:
+            grid: Grid = [[None] * self.size for _ in range(self.size)]
+            for player, kind, cover in self._history:
+                for index in bits(cover):
+                    r, c = divmod(index, self.size)
+                    grid[r][c] = (player, kind)
+            self._grid_view = grid
+        return self._grid_view
+
+    @property
+    def game_over(self) -> bool:
+        """
+        See BlokusBase
+
+        As in Blokus, the game is also over once the board is full.
+        """
+        return not self._active_players or self._occupied == self._full
+
+    @property
+    def winners(self) -> list[int]:
+        """
+        See BlokusBase
+        """
+        scores = {player: self.get_score(player) for
+                  player in range(1, self.num_players + 1)}
+
+        max_score = max(scores.values())
+
+        return [player for player, score in
+                scores.items() if score == max_score]
+
+    #
+    # METHODS
+    #
+
+    def remaining_shapes(self, player: int) -> list[ShapeKind]:
+        """
+        See BlokusBase
+        """
+        return [kind for kind in self._shapes
+                if kind not in self.player_used_shapes[player]]
+
+    def any_wall_collisions(self, piece: Piece) -> bool:
+        """
+        See BlokusBase
+        """
+        if piece.anchor is None:
+            raise ValueError("Piece must have an anchor")
+
+        for r, c in piece.squares():
+            if not (0 <= r < self.size and 0 <= c < self.size):
+                return True
+        return False
+
+    def any_collisions(self, piece: Piece) -> bool:
+        """
+        See BlokusBase
+
+        As in Blokus, also returns True if the piece would share an
+        edge with, or (after the opening moves) not touch a corner of,
+        the current player's pieces.
+        """
+        masks = placement_masks(self.size, piece.squares())
+        if masks is None:
+            return True
+        return not self._fits(self.curr_player, masks, check_start=False)
+
+    def legal_to_place(self, piece: Piece) -> bool:
+        """
+        See BlokusBase
+
+        As in Blokus, during the opening moves the piece must also
+        cover exactly one start position.
+        """
+        if piece.anchor is None:
+            raise ValueError("Piece must have an anchor")
+        masks = placement_masks(self.size, piece.squares())
+        if masks is None:
+            return False
+        return self._fits(self.curr_player, masks)
+
+    def maybe_place(self, piece: Piece) -> bool:
+        """
+        See BlokusBase
+        """
+        if not self.legal_to_place(piece):
+            return False
+
+        if piece.shape.kind in self.player_used_shapes[self.curr_player]:
+            raise ValueError("Piece already used by Player")
+
+        masks = placement_masks(self.size, piece.squares())
+        assert masks is not None
+        self._place(piece.shape.kind, masks)
+        return True
+
+    def retire(self) -> None:
+        """
+        See BlokusBase
+        """
+        self._retired_players.add(self._curr_player)
+        self._active_players.discard(self._curr_player)
+        self._curr_player = (self._curr_player % self.num_players) + 1
+
+    def get_score(self, player: int) -> int:
+        """
+        See BlokusBase
+        """
+        remaining = self.remaining_shapes(player)
+        if len(remaining) == 0:
+            if self.player_used_shapes[player][-1] == ShapeKind.ONE:
+                return 20
+            return 15
+        return -sum(len(self._shapes[kind].squares) for kind in remaining)
+
+    def available_moves(self) -> set[Piece]:
+        """
+        See BlokusBase
+
+        The pieces are built from the moves found by legal_moves.
+        """
+        return {move.to_piece()
+                for move in self.legal_moves()}
+
+    def legal_moves(self) -> set[Move]:
+        """
+        Returns the set of all moves that the current player may make,
+        as compact Move values rather than Pieces.
+
+        Only placements of the precomputed table that cover one of the
+        player's open corners (or, during the opening, a free start
+        position) are checked.
+        """
+        player = self.curr_player
+        if self.num_moves < self.num_players:
+            cells = self._start_mask & ~self._occupied
+        else:
+            cells = self._corner_masks[player]
+        cell_points = [divmod(index, self.size) for index in bits(cells)]
+
+        moves: set[Move] = set()
+        for kind in self.remaining_shapes(player):
+            for j, offsets in enumerate(ORIENTATIONS[kind]):
+                by_anchor = self._placements[kind][j]
+                anchors = {(r - dr, c - dc) for r, c in cell_points
+                           for dr, dc in offsets}
+                for anchor in anchors:
+                    masks = by_anchor.get(anchor)
+                    if masks is not None and self._fits(player, masks):
+                        moves.add(Move(kind, j, anchor))
+        return moves
+
+    def _fits(self, player: int, masks: Masks,
+              check_start: bool = True) -> bool:
+        """
+        Checks a placement, given by its masks, against the board for
+        the given player: it must not overlap any piece nor share an
+        edge with the player's pieces. During the opening moves it must
+        cover exactly one start position (if check_start is True), and
+        afterwards it must touch a corner of one of the player's pieces.
+        """
+        cover, edges, corners = masks
+        own = self._player_masks[player]
+        if cover & self._occupied or edges & own:
+            return False
+        if self.num_moves < self.num_players:
+            return not check_start or (cover & self._start_mask).bit_count() == 1
+        return bool(corners & own)
+
+    def _place(self, kind: ShapeKind, masks: Masks) -> None:
+        """
+        Places a (legal) piece of the current player, given by its kind
+        and masks, and passes the turn on.
+        """
+        player = self.curr_player
+        cover, _, corners = masks
+
+        self._occupied |= cover
+        self._player_masks[player] |= cover
+        for p in self._corner_masks:
+            self._corner_masks[p] &= ~self._occupied
+        self._corner_masks[player] = ((self._corner_masks[player] | corners)
+                                      & ~self._occupied
+                                      & ~self._edges_of(self._player_masks[player]))
+
+        self._history.append((player, kind, cover))
+        self._grid_view = None
+        self.player_used_shapes[player].append(kind)
+        if len(self.player_used_shapes[player]) == len(self._shapes):
+            self._active_players.discard(player)
+
+        checking_curr = (player % self.num_players) + 1
+        if checking_curr not in self._retired_players:
+            self._curr_player = checking_curr
+
+        self._num_moves += 1
+
+    def _edges_of(self, mask: int) -> int:
+        """
+        Returns the mask of the cells sharing an edge with a cell of
+        the given mask (which may include cells of the mask itself).
+        """
+        size = self.size
+        return (((mask << size) | (mask >> size)) & self._full) \
+            | ((mask << 1) & self._not_first_col) \
+            | ((mask >> 1) & self._not_last_col)
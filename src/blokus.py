@@ -1,22 +1,96 @@
-from typing import Optional, Callable
-from shape_definitions import ShapeKind, definitions
-from piece import Point, Shape, Piece
+import json
+import random
+from bisect import bisect_right
+import struct
+import zlib
+from typing import TYPE_CHECKING, Any, Iterator, Optional, Callable
+from shape_definitions import ShapeKind
+from piece import Point, Shape, Piece, shape_registry
 from base import BlokusBase, Grid
+from orientations import ORIENTATIONS, KINDS
+from move import Move
+from zobrist import ZobristKeys, position_key
+
+if TYPE_CHECKING:
+    # Only needed by legal_anchor_masks, which imports NumPy when called
+    import numpy as np
+
+# Offsets to the edge-adjacent and corner-adjacent cells of a square
+CARDINALS: list[Point] = [(-1, 0), (1, 0), (0, -1), (0, 1)]
+INTERCARDINALS: list[Point] = [(-1, -1), (-1, 1), (1, -1), (1, 1)]
+
+# Each player's remaining shapes are held as a bitmask (see inventory),
+# with bit i set for KINDS[i], as in self-play records and the batch
+# engine. remaining_shapes lists them in the order of the definitions.
+SHAPE_BITS: dict[ShapeKind, int] = {kind: 1 << i for i, kind
+                                    in enumerate(KINDS)}
+FULL_INVENTORY: int = (1 << len(SHAPE_BITS)) - 1
+_INVENTORY_BITS: tuple[tuple[ShapeKind, int], ...] = tuple(
+    (kind, SHAPE_BITS[kind]) for kind in shape_registry())
+
+# Number of squares of each shape, and of all the shapes of a player
+SQUARE_COUNTS: dict[ShapeKind, int] = {kind: len(shape.squares) for kind, shape
+                                       in shape_registry().items()}
+TOTAL_SQUARES: int = sum(SQUARE_COUNTS.values())
+
+# Orders accepted by Blokus.iter_available_moves
+MOVE_ORDERS: tuple[str, ...] = ("largest", "corner", "random")
+
+# Snapshot format (see Blokus.to_bytes): magic, version, board size,
+# number of players, current player, number of moves and number of
+# start positions, then each start position
+SNAPSHOT_MAGIC = b"BLKS"
+SNAPSHOT_VERSION = 1
+_SNAPSHOT_HEADER = struct.Struct("<4sBBBBHB")
+_SNAPSHOT_START = struct.Struct("<hh")
+
+class MoveRecord:
+    """
+    What make_move needs to remember to take a move back: the move
+    (None for a retirement), the squares it covered, the player who made
+    it, the number of moves, the player's score and the position's key
+    before it, whether it was a retirement, and whether the player had
+    already retired, and was still active, before it.
+    """
+
+    __slots__ = ("move", "squares", "player", "num_moves", "score", "key",
+                 "retired", "was_retired", "was_active")
+
+    def __init__(self, move: Optional[Move], squares: list[Point], player: int,
+                 num_moves: int, score: int, key: int, retired: bool,
+                 was_retired: bool, was_active: bool) -> None:
+        self.move = move
+        self.squares = squares
+        self.player = player
+        self.num_moves = num_moves
+        self.score = score
+        self.key = key
+        self.retired = retired
+        self.was_retired = was_retired
+        self.was_active = was_active
+
 
 class Blokus(BlokusBase):
     """
     Class for the Blokus Game
     """
     def __init__(self, num_player: int, size: int,
-                 start_positions: set[Point]) -> None:
+                 start_positions: set[Point], auto_retire: bool = False) -> None:
         """
         See BlokusBase 
+
+        With auto_retire, players who have no legal move left are
+        retired by maybe_place as soon as it is their turn (see
+        has_legal_move), so callers never have to enumerate every move
+        only to find that a player is stuck.
         """
 
         super().__init__(num_player, size, start_positions)
-        self._shapes = self._load_shapes()
+        self.auto_retire = auto_retire
+        self._shapes = shape_registry()
+        self._game_shapes: Optional[dict[ShapeKind, Shape]] = None
         self._curr_player: int = 1
-        self._grid:list[list[tuple[int, ShapeKind]]] = [[None] *
+        self._grid: list[list[Optional[tuple[int, ShapeKind]]]] = [[None] *
                                                         size for _ in range(size)]
         self._num_moves: int = 0
         self._retired_players:set[int]= set()
@@ -38,43 +112,55 @@ class Blokus(BlokusBase):
             if not (check(r) or check(c)):
                 raise ValueError("Invalid starting positions")
 
-        self.player_shapes_dict: dict[int,dict[ShapeKind,Shape]] = {i+1: self.shapes
+        self.player_used_shapes: dict[int, list[ShapeKind]] = {i+1: []
                                 for i in range(self.num_players)}
 
-        self.player_used_shapes: dict[int, list[ShapeKind]] = {i+1: []
+        # Open diagonal "corner" cells of each player, kept up to date
+        # as pieces are placed (see _update_corners)
+        self._corners: dict[int, set[Point]] = {i+1: set()
                                 for i in range(self.num_players)}
 
-    def _load_shapes(self) -> dict[ShapeKind, Shape]:
-        """
-        Loading all the shapes possible for the blokus game 
-        
-        Returns a dictionary with Shapekinds, shape: dict[ShapeKind,Shape]
-        """
-        shape_dict: dict[ShapeKind, Shape] = {}
+        # Counters kept up to date by maybe_place and retire, so that
+        # game_over never has to scan the board or the used shapes, and
+        # the bitmask of the shapes each player has left (see SHAPE_BITS)
+        self._empty_cells: int = size * size
+        self._inventory: dict[int, int] = {i+1: FULL_INVENTORY
+                                for i in range(self.num_players)}
+        self._active_players: set[int] = {i+1
+                                for i in range(self.num_players)}
 
-        for kind, string in definitions.items():
-            if "O" not in string and "@" not in string:
-                transformed = False
-            else:
-                transformed = True
+        # Running scores, updated by maybe_place, and the winners for
+        # the current scores (computed on demand, reset on every move)
+        self._scores: dict[int, int] = {i+1: -TOTAL_SQUARES
+                                for i in range(self.num_players)}
+        self._winners: Optional[list[int]] = None
 
-            if kind == ShapeKind.Z:
-                origin = (1,1)
-            else:
-                origin = (0,0)
-            shape = Shape(kind,origin, transformed, []).from_string(kind,string)
-            shape_dict[kind] = shape
+        # Records of the moves made with make_move, and the moves taken
+        # back with unmake_move, most recent last
+        self._undo_stack: list[MoveRecord] = []
+        self._redo_stack: list[Optional[Move]] = []
 
-        return shape_dict
+        # Zobrist key of the position, kept up to date by _place, retire
+        # and unmake_move (see zobrist.py)
+        self._zobrist = ZobristKeys.for_game(size, self.num_players)
+        self._key: int = self._zobrist.turn[self._curr_player]
 
     @property
     def shapes(self) -> dict[ShapeKind, Shape]:
         """
         See BlokusBase 
 
-        See shape_definitions.py for more details.
+        See shape_definitions.py for more details. Each game has its own
+        copies of the shapes, made the first time they are asked for,
+        so they can be flipped and rotated in place without affecting
+        other games. The engine itself only reads the frozen shapes of
+        the process-wide registry (see piece.shape_registry), so the
+        moves it finds do not depend on how these copies are oriented.
         """
-        return self._shapes
+        if self._game_shapes is None:
+            self._game_shapes = {kind: shape.copy()
+                                 for kind, shape in self._shapes.items()}
+        return self._game_shapes
 
     @property
     def size(self) -> int:
@@ -118,6 +204,18 @@ class Blokus(BlokusBase):
         """
         return self._grid
 
+    @property
+    def player_shapes_dict(self) -> dict[int, dict[ShapeKind, Shape]]:
+        """
+        Returns, for each player, a dict of the shapes they have left.
+        The dicts are built from the players' inventories on every call,
+        so no two players share one.
+        """
+        shapes = self.shapes
+        return {player: {kind: shapes[kind]
+                         for kind in self.remaining_shapes(player)}
+                for player in self._inventory}
+
     @property
     def curr_player_shapes(self) -> dict[ShapeKind, Shape]:
         """
@@ -125,7 +223,9 @@ class Blokus(BlokusBase):
         
         Returns a dict of Shapekinds as keys, and shapes as values
         """
-        return self.player_shapes_dict[self.curr_player]
+        shapes = self.shapes
+        return {kind: shapes[kind]
+                for kind in self.remaining_shapes(self.curr_player)}
 
     @property
     def game_over(self) -> bool:
@@ -134,29 +234,46 @@ class Blokus(BlokusBase):
 
         Additional functionality is, game is over when there's 
         no more empty positions on the board. 
+
+        This only reads counters maintained by maybe_place and retire.
         """
-        check = (len(self.retired_players) == self._num_players)
+        return not self._active_players or self._empty_cells == 0
 
-        return check or self.all_pieces_played or not self.fllled_board
+    @property
+    def active_players(self) -> set[int]:
+        """
+        Returns the players who can still move: those who have
+        neither retired nor played all their pieces.
+        """
+        return self._active_players
 
     @property
     def winners(self) -> list[int]:
         """
         See BlokusBase 
-        """
-        scores = {player: self.get_score(player) for
-                  player in range(1, self.num_players + 1)}
-
-        max_score = max(scores.values())
 
-        winners = [player for player, score in
-                   scores.items() if score == max_score]
-        return winners
+        The result is cached until the next piece is placed, so it
+        should not be modified by the caller.
+        """
+        if self._winners is None:
+            max_score = max(self._scores.values())
+            self._winners = [player for player, score in
+                             self._scores.items() if score == max_score]
+        return self._winners
 
     @property
     def num_moves(self) -> int:
         return self._num_moves
 
+    @property
+    def key(self) -> int:
+        """
+        Returns the Zobrist key of the current position (see zobrist.py).
+        Positions reached through different orders of the same moves
+        have the same key.
+        """
+        return self._key
+
     @property
     def all_pieces_played(self) -> bool:
         '''
@@ -169,12 +286,7 @@ class Blokus(BlokusBase):
             bool -> True if all players have played all their pieces
         '''
 
-        is_over: list[bool] = []
-        for i in range(self.num_players):
-            if len(self.player_used_shapes[i+1]) == 21:
-                is_over.append(True)
-
-        return len(is_over) == self.num_players
+        return not any(self._inventory.values())
 
     @property
     def fllled_board(self) -> bool:
@@ -185,24 +297,47 @@ class Blokus(BlokusBase):
         Returns, a bool 
         """
 
-        for iy,_ in enumerate(self.grid):
-            for ix,_ in enumerate(self.grid):
-                if self.grid[iy][ix] == None:
-                    return True
-        return False
+        return self._empty_cells > 0
 
     #
     # METHODS
     #
 
+    def corners(self, player: int) -> set[Point]:
+        """
+        Returns the player's open corners: the empty cells that touch
+        one of the player's squares diagonally but none of them along
+        an edge. After the opening, every legal placement by the player
+        covers at least one of these cells.
+        """
+        return self._corners[player]
+
+    def inventory(self, player: int) -> int:
+        """
+        Returns the bitmask of the shapes the player has left: the bit
+        SHAPE_BITS[kind] is set while the player has not played kind.
+        """
+        return self._inventory[player]
+
+    def has_shape(self, player: int, kind: ShapeKind) -> bool:
+        """
+        Returns True if the player has not played a piece of the given
+        kind yet.
+        """
+        return self._inventory[player] & SHAPE_BITS[kind] != 0
+
+    def num_remaining(self, player: int) -> int:
+        """
+        Returns the number of shapes the player has left.
+        """
+        return self._inventory[player].bit_count()
+
     def remaining_shapes(self, player: int) -> list[ShapeKind]:
         """
         See BlokusBase 
         """
-        shapes_of_player = self.player_shapes_dict[player]
-
-        return [shape for shape in shapes_of_player.keys()
-                if shape not in self.player_used_shapes[player]]
+        inventory = self._inventory[player]
+        return [kind for kind, bit in _INVENTORY_BITS if inventory & bit]
 
     def any_wall_collisions(self, piece: Piece) -> bool:
         """
@@ -222,24 +357,28 @@ class Blokus(BlokusBase):
 
         Additionally, function returns true if the intercardinal position 
         IS NOT a piece placed by the current player, False otherwise. 
+
+        The squares and neighbors are read from the piece's footprint,
+        which is computed once per anchor and orientation.
         """
+        footprint = piece.footprint()
 
-        for r,c in piece.squares():
+        for r,c in footprint.squares:
             if self.grid[r][c] != None:
                 return True
 
-        for r, c in piece.cardinal_neighbors():
-            if r in range(0, self.size) and c in range(0, self.size):
-                if self.grid[r][c] is not None:
-                    if self.grid[r][c][0] == self.curr_player:
-                        return True
+        for r, c in footprint.edges:
+            if 0 <= r < self.size and 0 <= c < self.size:
+                cell = self.grid[r][c]
+                if cell is not None and cell[0] == self.curr_player:
+                    return True
 
         if self.num_moves >= self.num_players:
-            for r, c in piece.intercardinal_neighbors():
-                if r in range(0, self.size) and c in range(0, self.size):
-                    if self.grid[r][c] is not None:
-                        if self.grid[r][c][0] == self.curr_player:
-                            return False
+            for r, c in footprint.corners:
+                if 0 <= r < self.size and 0 <= c < self.size:
+                    cell = self.grid[r][c]
+                    if cell is not None and cell[0] == self.curr_player:
+                        return False
             return True
         return False
 
@@ -273,62 +412,809 @@ class Blokus(BlokusBase):
         if not self.legal_to_place(piece):
             return False
 
-        if piece.shape.kind in self.player_used_shapes[self.curr_player]:
+        if not self.has_shape(self.curr_player, piece.shape.kind):
             raise ValueError("Piece already used by Player")
 
-        for r, c in piece.squares():
-            self._grid[r][c] = (self._curr_player, piece.shape.kind)
+        self._place(piece.shape.kind, piece.squares())
+        if self.auto_retire:
+            self._retire_stuck_players()
+        return True
 
-        self.player_used_shapes[self.curr_player].append(piece.shape.kind)
+    def _retire_stuck_players(self) -> None:
+        """
+        Retires players, starting with the current one, until the game
+        is over or the current player is still in the game and has a
+        legal move. A player who has already retired can be current
+        (see _place), in which case retire only passes the turn on.
+        """
+        while not self.game_over and \
+                (self._curr_player in self._retired_players
+                 or not self.has_legal_move()):
+            self.retire()
 
+    def _place(self, kind: ShapeKind, squares: list[Point]) -> None:
+        """
+        Places a (legal) piece of the given kind, covering the given
+        squares, for the current player, updates the game state, and
+        passes the turn on.
+        """
+        cell_keys = self._zobrist.cells[self._curr_player]
+        for r, c in squares:
+            self._grid[r][c] = (self._curr_player, kind)
+            self._key ^= cell_keys[r * self._size + c]
+        self._key ^= self._zobrist.shapes[self._curr_player][kind]
+        self._update_corners(self.curr_player, squares)
+
+        self.player_used_shapes[self.curr_player].append(kind)
+
+        self._empty_cells -= len(squares)
+        self._inventory[self.curr_player] &= ~SHAPE_BITS[kind]
+        if self._inventory[self.curr_player] == 0:
+            self._active_players.discard(self.curr_player)
+        self._update_score(self.curr_player, kind, len(squares))
+
+        self._key ^= self._zobrist.turn[self._curr_player]
         checking_curr = (self.curr_player % self.num_players) + 1
         if checking_curr not in self._retired_players:
             self._curr_player = (self.curr_player % self.num_players) + 1
+        self._key ^= self._zobrist.turn[self._curr_player]
 
         self._num_moves += 1
-        return True
 
     def retire(self) -> None:
         """
         See BlokusBase 
         """
+        # A retired player can be asked to move again (see _place), and
+        # retiring twice must not toggle the key back
+        if self._curr_player not in self._retired_players:
+            self._key ^= self._zobrist.retired[self._curr_player]
         self._retired_players.add(self._curr_player)
+        self._active_players.discard(self._curr_player)
+        self._key ^= self._zobrist.turn[self._curr_player]
         if self.curr_player % self.num_players != 0:
             self._curr_player = (self._curr_player % self.num_players) + 1
         else:
             self._curr_player = 1
+        self._key ^= self._zobrist.turn[self._curr_player]
+
+    def make_move(self, move: Optional[Move]) -> bool:
+        """
+        Plays a move for the current player, or retires them if the move
+        is None, and records how to take it back with unmake_move. Unlike
+        maybe_place, no Piece is needed, which makes this suitable for
+        searching through many positions.
+
+        Inputs:
+            move, a Move or None
+
+        Returns, False (leaving the game unmodified) if the move is not
+        legal, True otherwise.
+
+        Raises ValueError if the player has already played a piece with
+        this shape.
+        """
+        player = self.curr_player
+        was_retired = player in self._retired_players
+        was_active = player in self._active_players
+        if move is None:
+            record = MoveRecord(None, [], player, self._num_moves,
+                                self._scores[player], self._key, True,
+                                was_retired, was_active)
+            self.retire()
+        else:
+            if not self.has_shape(player, move.kind):
+                raise ValueError("Piece already used by Player")
+            squares = move.squares()
+            if not self._fits(player, squares):
+                return False
+            record = MoveRecord(move, squares, player, self._num_moves,
+                                self._scores[player], self._key, False,
+                                was_retired, was_active)
+            self._place(move.kind, squares)
+
+        self._undo_stack.append(record)
+        self._redo_stack.clear()
+        return True
+
+    def unmake_move(self) -> None:
+        """
+        Takes back the last move made with make_move, restoring the game
+        to exactly the state it was in before that move.
+
+        Raises ValueError if there is no move to take back.
+        """
+        if not self._undo_stack:
+            raise ValueError("No move to take back")
+        record = self._undo_stack.pop()
+        player = record.player
+
+        # A player who had retired before the move stays retired (a
+        # retired player can be asked to move again, see _place)
+        if record.retired:
+            if not record.was_retired:
+                self._retired_players.discard(player)
+        else:
+            assert record.move is not None
+            for r, c in record.squares:
+                self._grid[r][c] = None
+            self._refresh_corners(record.squares)
+            self.player_used_shapes[player].pop()
+            self._empty_cells += len(record.squares)
+            self._inventory[player] |= SHAPE_BITS[record.move.kind]
+            self._scores[player] = record.score
+            self._winners = None
+
+        if record.was_active:
+            self._active_players.add(player)
+        self._curr_player = player
+        self._num_moves = record.num_moves
+        self._key = record.key
+        self._redo_stack.append(record.move)
+
+    def redo_move(self) -> None:
+        """
+        Plays again the last move taken back with unmake_move.
+
+        Raises ValueError if there is no move to play again.
+        """
+        if not self._redo_stack:
+            raise ValueError("No move to play again")
+        redo = self._redo_stack
+        self._redo_stack = []
+        self.make_move(redo.pop())
+        self._redo_stack = redo
+
+    def to_bytes(self) -> bytes:
+        """
+        Returns a compact snapshot of the position: the board size,
+        start positions and number of players, the grid, the current
+        player, the retired players, the shapes each player has used
+        (in order) and the number of moves. The moves that could be
+        taken back with unmake_move are not included.
+
+        The grid is stored as one byte per cell (player * 32 + the index
+        of the shape in KINDS, or 0 for an empty cell) and compressed,
+        so snapshots take a few hundred bytes at most.
+
+        Raises ValueError if the game has more than seven players.
+        """
+        if self.num_players > 7:
+            raise ValueError("Cannot snapshot games of more than 7 players")
+        data = bytearray(_SNAPSHOT_HEADER.pack(
+            SNAPSHOT_MAGIC, SNAPSHOT_VERSION, self.size, self.num_players,
+            self.curr_player, self.num_moves, len(self.start_positions)))
+        for r, c in sorted(self.start_positions):
+            data += _SNAPSHOT_START.pack(r, c)
+
+        data.append(sum(1 << (player - 1) for player in self.retired_players))
+        for player in range(1, self.num_players + 1):
+            used = self.player_used_shapes[player]
+            data.append(len(used))
+            data += bytes(KINDS.index(kind) for kind in used)
+
+        cells = bytes(0 if cell is None else cell[0] * 32 + KINDS.index(cell[1])
+                      for row in self._grid for cell in row)
+        return bytes(data) + zlib.compress(cells)
+
+    @staticmethod
+    def from_bytes(data: bytes) -> "Blokus":
+        """
+        Restores a game from a snapshot made by to_bytes. The position
+        is set up directly rather than by replaying moves.
+
+        Raises ValueError if the data is not a valid snapshot.
+        """
+        try:
+            magic, version, size, num_players, curr_player, num_moves, \
+                num_starts = _SNAPSHOT_HEADER.unpack_from(data, 0)
+            if magic != SNAPSHOT_MAGIC:
+                raise ValueError("Not a Blokus snapshot")
+            if version != SNAPSHOT_VERSION:
+                raise ValueError(f"Unsupported snapshot version {version}")
+            offset = _SNAPSHOT_HEADER.size
+            starts = set()
+            for _ in range(num_starts):
+                starts.add(_SNAPSHOT_START.unpack_from(data, offset))
+                offset += _SNAPSHOT_START.size
+
+            retired_mask = data[offset]
+            offset += 1
+            used: dict[int, list[ShapeKind]] = {}
+            for player in range(1, num_players + 1):
+                count = data[offset]
+                used[player] = [KINDS[i] for i in
+                                data[offset + 1:offset + 1 + count]]
+                offset += 1 + count
+
+            cells = zlib.decompress(data[offset:])
+            if len(cells) != size * size:
+                raise ValueError("Invalid snapshot grid")
+            grid = [[None if cell == 0 else (cell >> 5, KINDS[cell & 31])
+                     for cell in cells[r * size:(r + 1) * size]]
+                    for r in range(size)]
+            retired = {player for player in range(1, num_players + 1)
+                       if retired_mask >> (player - 1) & 1}
+            game = Blokus(num_players, size, starts)
+            game._restore(grid, curr_player, retired, used, num_moves)
+        except (struct.error, IndexError, KeyError, zlib.error) as e:
+            raise ValueError("Invalid Blokus snapshot") from e
+        return game
+
+    def to_json(self) -> str:
+        """
+        Returns the same snapshot as to_bytes, as readable JSON (meant
+        for debugging).
+        """
+        return json.dumps({
+            "size": self.size,
+            "num_players": self.num_players,
+            "start_positions": sorted(self.start_positions),
+            "curr_player": self.curr_player,
+            "num_moves": self.num_moves,
+            "retired_players": sorted(self.retired_players),
+            "used_shapes": {player: [kind.name for kind in kinds]
+                            for player, kinds in self.player_used_shapes.items()},
+            "grid": [[None if cell is None else [cell[0], cell[1].name]
+                      for cell in row] for row in self._grid],
+        })
+
+    @staticmethod
+    def from_json(text: str) -> "Blokus":
+        """
+        Restores a game from a snapshot made by to_json.
+
+        Raises ValueError if the text is not a valid snapshot.
+        """
+        try:
+            state: dict[str, Any] = json.loads(text)
+            game = Blokus(state["num_players"], state["size"],
+                          {(r, c) for r, c in state["start_positions"]})
+            grid = [[None if cell is None else (cell[0], ShapeKind[cell[1]])
+                     for cell in row] for row in state["grid"]]
+            used = {int(player): [ShapeKind[name] for name in kinds]
+                    for player, kinds in state["used_shapes"].items()}
+            game._restore(grid, state["curr_player"],
+                          set(state["retired_players"]), used,
+                          state["num_moves"])
+        except (AttributeError, IndexError, KeyError, TypeError) as e:
+            raise ValueError("Invalid Blokus snapshot") from e
+        return game
+
+    def _restore(self, grid: list[list[Optional[tuple[int, ShapeKind]]]],
+                 curr_player: int, retired: set[int],
+                 used: dict[int, list[ShapeKind]], num_moves: int) -> None:
+        """
+        Sets up a new game in the given position, and recomputes the
+        open corners, counters, scores and key from it.
+
+        Raises ValueError if the position does not fit the game.
+        """
+        if len(grid) != self.size or any(len(row) != self.size for row in grid) \
+                or set(used) != set(self.player_used_shapes) \
+                or not 1 <= curr_player <= self.num_players \
+                or any(cell is not None and not 1 <= cell[0] <= self.num_players
+                       for row in grid for cell in row):
+            raise ValueError("Invalid Blokus snapshot")
+
+        self._grid = grid
+        self._curr_player = curr_player
+        self._num_moves = num_moves
+        self._retired_players = set(retired)
+        self.player_used_shapes = {player: list(kinds)
+                                   for player, kinds in used.items()}
+
+        self._empty_cells = sum(cell is None for row in grid for cell in row)
+        for player, kinds in used.items():
+            for kind in kinds:
+                self._inventory[player] &= ~SHAPE_BITS[kind]
+            if self._inventory[player] == 0:
+                self._scores[player] = 20 if kinds[-1] == ShapeKind.ONE else 15
+            else:
+                self._scores[player] += sum(SQUARE_COUNTS[kind] for kind in kinds)
+        self._active_players = {player for player in used
+                                if player not in retired
+                                and self._inventory[player]}
+        self._winners = None
+
+        # The open corners are the empty cells diagonal to one of the
+        # player's squares that do not share an edge with another
+        size = self.size
+        for r, row in enumerate(grid):
+            for c, cell in enumerate(row):
+                if cell is None:
+                    continue
+                player = cell[0]
+                own = self._corners[player]
+                for dr, dc in INTERCARDINALS:
+                    nr, nc = r + dr, c + dc
+                    if 0 <= nr < size and 0 <= nc < size \
+                            and grid[nr][nc] is None and (nr, nc) not in own \
+                            and not self._touches_edge(player, nr, nc):
+                        own.add((nr, nc))
+        self._key = position_key(self, self.player_used_shapes)
+
+    def _refresh_corners(self, squares: list[Point]) -> None:
+        """
+        Recomputes, for every player, whether the given squares and the
+        cells around them are open corners. Used after pieces have been
+        removed from the board by unmake_move.
+        """
+        cells = set(squares)
+        for r, c in squares:
+            for dr, dc in CARDINALS + INTERCARDINALS:
+                nr, nc = r + dr, c + dc
+                if 0 <= nr < self.size and 0 <= nc < self.size:
+                    cells.add((nr, nc))
+
+        for player, corners in self._corners.items():
+            for r, c in cells:
+                if self._grid[r][c] is None \
+                        and not self._touches_edge(player, r, c) \
+                        and self._touches_corner(player, r, c):
+                    corners.add((r, c))
+                else:
+                    corners.discard((r, c))
+
+    def _touches_corner(self, player: int, r: int, c: int) -> bool:
+        """
+        Returns True if the cell (r, c) touches a corner of
+        one of the player's squares.
+        """
+        for dr, dc in INTERCARDINALS:
+            nr, nc = r + dr, c + dc
+            if 0 <= nr < self.size and 0 <= nc < self.size:
+                cell = self._grid[nr][nc]
+                if cell is not None and cell[0] == player:
+                    return True
+        return False
 
     def get_score(self, player: int) -> int:
         """
         See BlokusBase 
+
+        Scores are kept up to date by maybe_place (see _update_score).
         """
-        sum_score = 0
-        if len(self.remaining_shapes(player)) == 0:
-            if self.player_used_shapes[player][-1] == ShapeKind.ONE:
-                return 20
-            else:
-                return 15
-        for each in self.remaining_shapes(player):
-            sum_score += len(self._shapes[each].squares)
-        return -sum_score
+        return self._scores[player]
+
+    def _update_score(self, player: int, kind: ShapeKind, num_squares: int) -> None:
+        """
+        Updates the player's score after they placed a piece of the given
+        kind covering num_squares squares. While pieces remain, the score
+        is minus the number of squares left to play; a player who has
+        played every piece scores 15, or 20 if the last one was ONE.
+        """
+        if self._inventory[player] == 0:
+            self._scores[player] = 20 if kind == ShapeKind.ONE else 15
+        else:
+            self._scores[player] += num_squares
+        self._winners = None
 
     def available_moves(self) -> set[Piece]:
         """
-        See BlokusBase 
+        See BlokusBase
+
+        The pieces are built from the moves found by legal_moves.
         """
-        available_moves = set()
-        remaining_shapes = self.remaining_shapes(self.curr_player)
+        return {move.to_piece() for move in self.legal_moves()}
 
-        for shape_kind in remaining_shapes:
-            shape = self.shapes[shape_kind]
-            for r in range(self.size):
-                for c in range(self.size):
-                    piece = Piece(shape)
-                    piece.set_anchor((r, c))
-                    if self.legal_to_place(piece):
-                        available_moves.add(piece)
+    def legal_moves(self) -> set[Move]:
+        """
+        Returns the set of all moves that the current player may make,
+        as compact Move values rather than Pieces.
+
+        Every distinct orientation of each remaining shape is tried
+        (see orientations.py), at the anchors found by _placements.
+        """
+        player = self.curr_player
+        return {Move(kind, j, anchor) for kind, j, anchor
+                in self._placements(player, self.remaining_shapes(player))}
+
+    def count_moves(self, player: Optional[int] = None) -> int:
+        """
+        Returns the number of moves the player could make if it were
+        their turn: the same number as len(legal_moves()) for the
+        current player, but without building any Move or Piece.
 
-        return available_moves
+        Inputs:
+            player, an int (the current player by default)
+
+        Returns, an int
+        """
+        return sum(self.count_moves_by_shape(player).values())
+
+    def count_moves_by_shape(self, player: Optional[int] = None,
+                             ) -> dict[ShapeKind, int]:
+        """
+        Counts the legal (shape, orientation, anchor) placements of each
+        shape the player has left, searching from their candidate cells
+        as legal_moves does. Any player can be counted, not only the
+        current one, so evaluations can compare the mobility of every
+        player.
+
+        Inputs:
+            player, an int (the current player by default)
+
+        Returns, a dict mapping each remaining ShapeKind of the player
+        to its number of legal placements (possibly 0)
+        """
+        if player is None:
+            player = self.curr_player
+        kinds = self.remaining_shapes(player)
+        counts = dict.fromkeys(kinds, 0)
+        for kind, _, _ in self._placements(player, kinds):
+            counts[kind] += 1
+        return counts
+
+    def has_legal_move(self, player: Optional[int] = None) -> bool:
+        """
+        Returns True if the player could place a piece if it were their
+        turn. The largest remaining shapes are tried first, and only
+        from the player's candidate cells, stopping at the first legal
+        placement, so this is much cheaper than building legal_moves
+        to find out that a player is stuck.
+
+        Inputs:
+            player, an int (the current player by default)
+
+        Returns, a bool
+        """
+        if player is None:
+            player = self.curr_player
+        kinds = sorted(self.remaining_shapes(player),
+                       key=SQUARE_COUNTS.__getitem__, reverse=True)
+        return next(self._placements(player, kinds), None) is not None
+
+    def iter_available_moves(self, order: str = "largest",
+                             rng: Optional[random.Random] = None,
+                             ) -> Iterator[Move]:
+        """
+        Lazily yields the current player's legal moves, as Moves, so a
+        caller that stops early only pays for the moves it has looked
+        at. The game must not be changed while iterating.
+
+        Inputs:
+            order, one of MOVE_ORDERS:
+                "largest", the largest shapes first (in definition order
+                    among shapes of the same size)
+                "corner", the moves covering each of the player's
+                    candidate cells (see _candidate_cells) in turn, the
+                    cells taken in sorted order
+                "random", a uniformly random order: the candidate
+                    placements are shuffled lazily, one step of a
+                    Fisher-Yates shuffle per candidate looked at, and
+                    the illegal ones skipped (see _shuffled_placements).
+                    The first k moves are then a uniform sample of k
+                    legal moves.
+            rng, a random.Random, needed for the random order
+
+        Returns, an iterator of Moves
+
+        Raises ValueError for an unknown order, or for the random order
+        without rng.
+        """
+        player = self.curr_player
+        kinds = self.remaining_shapes(player)
+        if order == "largest":
+            kinds.sort(key=SQUARE_COUNTS.__getitem__, reverse=True)
+            placements = self._placements(player, kinds)
+        elif order == "corner":
+            placements = self._corner_placements(player, kinds)
+        elif order == "random":
+            if rng is None:
+                raise ValueError("A random order needs a random generator")
+            placements = self._shuffled_placements(player, kinds, rng)
+        else:
+            raise ValueError(f"Unknown move order {order!r}")
+        return (Move(kind, j, anchor) for kind, j, anchor in placements)
+
+    def _placement_test(self, player: int) -> Callable[[list[Point]], bool]:
+        """
+        Returns a function telling whether a piece covering the given
+        squares, one of which is a candidate cell of the player, could
+        be placed by them.
+
+        Whether a cell may be covered (it is on the board, empty and
+        not along an edge of the player's pieces) is worked out once per
+        cell, so each placement then costs a few dict lookups. Covering
+        a candidate cell already guarantees the corner contact needed
+        after the opening.
+        """
+        opening = self._num_moves < self._num_players
+        starts = self._start_positions
+        size = self._size
+        grid = self._grid
+        free: dict[Point, bool] = {}
+
+        def fits(squares: list[Point]) -> bool:
+            for square in squares:
+                ok = free.get(square)
+                if ok is None:
+                    r, c = square
+                    ok = free[square] = (0 <= r < size and 0 <= c < size
+                                         and grid[r][c] is None
+                                         and not self._touches_edge(player, r, c))
+                if not ok:
+                    return False
+            return not opening or sum(square in starts
+                                      for square in squares) == 1
+        return fits
+
+    def _placements(self, player: int, kinds: list[ShapeKind],
+                    ) -> Iterator[tuple[ShapeKind, int, Point]]:
+        """
+        Lazily yields the legal placements of the given shapes by the
+        player, shape by shape in the given order, as (kind, orientation
+        index, anchor) triples. Rather than trying every anchor on the
+        board, only placements that cover one of the player's candidate
+        cells (see _candidate_cells) are checked, so the work scales
+        with the number of live corners instead of the board area.
+        """
+        cells = self._candidate_cells(player)
+        if not cells:
+            return
+        fits = self._placement_test(player)
+
+        for kind in kinds:
+            for j, offsets in enumerate(ORIENTATIONS[kind]):
+                anchors = {(r - dr, c - dc) for r, c in cells
+                           for dr, dc in offsets}
+                for ar, ac in anchors:
+                    if fits([(ar + dr, ac + dc) for dr, dc in offsets]):
+                        yield kind, j, (ar, ac)
+
+    def _corner_placements(self, player: int, kinds: list[ShapeKind],
+                           ) -> Iterator[tuple[ShapeKind, int, Point]]:
+        """
+        Like _placements, but yields the placements covering each of the
+        player's candidate cells in turn. A placement covering several
+        of them is only yielded for the first.
+        """
+        fits = self._placement_test(player)
+        seen: set[tuple[ShapeKind, int, Point]] = set()
+
+        for r, c in sorted(self._candidate_cells(player)):
+            for kind in kinds:
+                for j, offsets in enumerate(ORIENTATIONS[kind]):
+                    for dr, dc in offsets:
+                        ar, ac = r - dr, c - dc
+                        placement = (kind, j, (ar, ac))
+                        if placement not in seen and \
+                                fits([(ar + er, ac + ec) for er, ec in offsets]):
+                            seen.add(placement)
+                            yield placement
+
+    def _shuffled_placements(self, player: int, kinds: list[ShapeKind],
+                             rng: random.Random,
+                             ) -> Iterator[tuple[ShapeKind, int, Point]]:
+        """
+        Like _placements, but in a uniformly random order (see
+        iter_available_moves).
+
+        The candidates are the (orientation, candidate cell, square of
+        the orientation) triples, each placing the square on the cell.
+        They are numbered implicitly, and shuffled one Fisher-Yates
+        step at a time, keeping only the swapped numbers in a dict, so
+        nothing is listed up front. A placement covering several
+        candidate cells is only kept for the first of them (in sorted
+        order), so every placement has exactly one chance to come up
+        and the order stays uniform.
+        """
+        cells = sorted(self._candidate_cells(player))
+        cell_index = {cell: i for i, cell in enumerate(cells)}
+        fits = self._placement_test(player)
+
+        # The orientations, and the number of the first candidate of
+        # each, plus the total
+        groups = [(kind, j, offsets) for kind in kinds
+                  for j, offsets in enumerate(ORIENTATIONS[kind])]
+        starts = [0]
+        for _, _, offsets in groups:
+            starts.append(starts[-1] + len(cells) * len(offsets))
+        total = starts.pop()
+
+        swapped: dict[int, int] = {}
+        for i in range(total):
+            k = rng.randrange(i, total)
+            number = swapped.get(k, k)
+            swapped[k] = swapped.get(i, i)
+
+            g = bisect_right(starts, number) - 1
+            kind, j, offsets = groups[g]
+            ci, oi = divmod(number - starts[g], len(offsets))
+            r, c = cells[ci]
+            dr, dc = offsets[oi]
+            ar, ac = r - dr, c - dc
+            squares = [(ar + er, ac + ec) for er, ec in offsets]
+            if min(cell_index.get(square, ci) for square in squares) == ci \
+                    and fits(squares):
+                yield kind, j, (ar, ac)
+
+    def legal_anchor_masks(self) -> dict[ShapeKind, list["np.ndarray"]]:
+        """
+        Computes, with NumPy, where every orientation of every shape
+        the current player has left can be legally placed, as one
+        boolean board mask per orientation. Unlike legal_moves, every
+        position on the board is checked; this is meant for analysis
+        tooling (see numpy_masks.py, which is only imported, along with
+        NumPy, when this method is called).
+
+        Returns, a dict mapping each remaining ShapeKind to a list of
+        (size x size) boolean arrays, one per orientation in
+        ORIENTATIONS[kind], indexed by the top-left corner of the
+        orientation's bounding box
+        """
+        from numpy_masks import legal_anchor_masks
+        return legal_anchor_masks(self)
+
+    def random_move(self, rng: random.Random, tries: int = 64) -> Optional[Move]:
+        """
+        Returns a random legal move of the current player, or None if
+        they have none. Random placements covering one of the player's
+        candidate cells are tried first, so that usually neither the
+        full set of moves nor any Piece has to be built; only after
+        `tries` misses are the placements scanned in a random order,
+        stopping at the first legal one. Meant for fast playouts, so
+        the moves are not exactly uniformly drawn.
+
+        Inputs:
+            rng, a random.Random
+            tries, an int
+
+        Returns, a Move or None
+        """
+        player = self.curr_player
+        cells = sorted(self._candidate_cells(player))
+        kinds = self.remaining_shapes(player)
+        if not cells or not kinds:
+            return None
+
+        for _ in range(tries):
+            kind = rng.choice(kinds)
+            j = rng.randrange(len(ORIENTATIONS[kind]))
+            offsets = ORIENTATIONS[kind][j]
+            r, c = rng.choice(cells)
+            dr, dc = rng.choice(offsets)
+            move = Move(kind, j, (r - dr, c - dc))
+            if self._fits(player, move.squares()):
+                return move
+
+        kinds = kinds[:]
+        rng.shuffle(kinds)
+        for kind in kinds:
+            for j, offsets in enumerate(ORIENTATIONS[kind]):
+                anchors = sorted({(r - dr, c - dc) for r, c in cells
+                                  for dr, dc in offsets})
+                rng.shuffle(anchors)
+                for ar, ac in anchors:
+                    if self._fits(player, [(ar + dr, ac + dc)
+                                           for dr, dc in offsets]):
+                        return Move(kind, j, (ar, ac))
+        return None
+
+    def corners_gained(self, move: Move) -> int:
+        """
+        Returns the number of open corners the current player would gain
+        by making the move: the free cells touching a corner of the move's
+        squares but no edge of them or of the player's other pieces, and
+        which are not already open corners of the player.
+
+        Inputs:
+            move, a Move
+
+        Returns, an int
+        """
+        player = self.curr_player
+        squares = set(move.squares())
+        edges = {(r + dr, c + dc) for r, c in squares for dr, dc in CARDINALS}
+        corners = self._corners[player]
+
+        gained = set()
+        for r, c in squares:
+            for dr, dc in INTERCARDINALS:
+                cell = (r + dr, c + dc)
+                nr, nc = cell
+                if 0 <= nr < self.size and 0 <= nc < self.size \
+                        and cell not in squares and cell not in edges \
+                        and cell not in corners \
+                        and self._grid[nr][nc] is None \
+                        and not self._touches_edge(player, nr, nc):
+                    gained.add(cell)
+        return len(gained)
+
+    def _fits(self, player: int, squares: list[Point]) -> bool:
+        """
+        Checks whether a piece covering the given squares could be
+        placed by the player, following the same rules as legal_to_place
+        but without building a Piece.
+
+        Inputs:
+            player, an int
+            squares, a list of Points
+
+        Returns, a bool
+        """
+        size = self._size
+        grid = self._grid
+        for r, c in squares:
+            if not (0 <= r < size and 0 <= c < size):
+                return False
+            if grid[r][c] is not None:
+                return False
+
+        for r, c in squares:
+            for dr, dc in CARDINALS:
+                nr, nc = r + dr, c + dc
+                if 0 <= nr < size and 0 <= nc < size:
+                    cell = grid[nr][nc]
+                    if cell is not None and cell[0] == player:
+                        return False
+
+        if self._num_moves < self._num_players:
+            on_start = [sq for sq in squares if sq in self._start_positions]
+            return len(on_start) == 1
+
+        for r, c in squares:
+            for dr, dc in INTERCARDINALS:
+                nr, nc = r + dr, c + dc
+                if 0 <= nr < size and 0 <= nc < size:
+                    cell = grid[nr][nc]
+                    if cell is not None and cell[0] == player:
+                        return True
+        return False
+
+    def _candidate_cells(self, player: int) -> set[Point]:
+        """
+        Returns the cells that any legal placement by the player must
+        cover: the free start positions while the game is still in its
+        opening moves, and the player's open corners afterwards.
+
+        Inputs:
+            player, an int
+
+        Returns, a set of Points
+        """
+        if self.num_moves < self.num_players:
+            return {(r, c) for r, c in self.start_positions
+                    if 0 <= r < self.size and 0 <= c < self.size
+                    and self._grid[r][c] is None}
+        return self._corners[player]
+
+    def _touches_edge(self, player: int, r: int, c: int) -> bool:
+        """
+        Returns True if the cell (r, c) shares an edge with
+        one of the player's squares.
+        """
+        for dr, dc in CARDINALS:
+            nr, nc = r + dr, c + dc
+            if 0 <= nr < self.size and 0 <= nc < self.size:
+                cell = self._grid[nr][nc]
+                if cell is not None and cell[0] == player:
+                    return True
+        return False
+
+    def _update_corners(self, player: int, squares: list[Point]) -> None:
+        """
+        Updates the open corners after the player has placed a piece
+        covering the given squares. The squares are no longer open for
+        anyone, cells along the new piece's edges are closed for the
+        player, and the new piece's free diagonals are opened.
+        """
+        for corners in self._corners.values():
+            corners.difference_update(squares)
+
+        own = self._corners[player]
+        for r, c in squares:
+            for dr, dc in CARDINALS:
+                own.discard((r + dr, c + dc))
+
+        for r, c in squares:
+            for dr, dc in INTERCARDINALS:
+                nr, nc = r + dr, c + dc
+                if 0 <= nr < self.size and 0 <= nc < self.size \
+                        and self._grid[nr][nc] is None \
+                        and not self._touches_edge(player, nr, nc):
+                    own.add((nr, nc))
 
     def on_start_pos(self, piece:Piece) -> bool:
         """
@@ -5,18 +5,62 @@ This module contains classes for different bots for playing Blokus
 """
 
 from abc import ABC, abstractmethod
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from itertools import islice
+from typing import Any, Iterable, Iterator, Mapping, Optional, TypedDict, cast
+import base64
+import json
+import math
+import os
 import random
+import time
 import click
 from blokus import Blokus
 from piece import Piece
+from move import Move
+from zobrist import TranspositionTable, EXACT, LOWER, UPPER
+
+class GameCheckpoint(TypedDict):
+    """
+    A game in progress, as saved in a checkpoint: its position (see
+    Blokus.to_bytes, base64-encoded) and the states of both bots'
+    random generators
+    """
+    position: str
+    rngs: list[Any]
+
+class Checkpoint(TypedDict):
+    """
+    The contents of the checkpoint file of a run of play_games
+    """
+    seed: int
+    first_game: int
+    num_games: int
+    next_game: int
+    results: list[int]
+    game: Optional[GameCheckpoint]
 
 class BaseBot(ABC):
     """
     Represents a base bot playing Blokus
+
+    Every random choice a bot makes comes from its own random.Random
+    (self.rng) rather than from the global random module. The game
+    driver (play_games) reseeds it at the start of every game, from a
+    master seed and the game's index, so that a batch of games gives the
+    same results no matter how it is split among worker processes.
+
+    Tournaments can be checkpointed to a file (see play_games), so that
+    an interrupted run can be resumed where it stopped.
     """
 
-    def __init__(self, bot_id: int):
+    # Minimum time, in seconds, between two checkpoints of a game in
+    # progress (a checkpoint is always written after every game)
+    checkpoint_interval: float = 5.0
+
+    def __init__(self, bot_id: int, rng: Optional[random.Random] = None):
         self.bot_id = bot_id
+        self.rng = rng if rng is not None else random.Random()
 
     @abstractmethod
     def make_move(self, game: Blokus) -> Piece | None:
@@ -24,57 +68,274 @@ class BaseBot(ABC):
         Make move
         """
 
-    def play_game(self, opponent: 'BaseBot', num_games: int) -> tuple[int, int, int]:
+    def close(self) -> None:
+        """
+        Releases the resources of the bot, if any. play_games closes
+        both bots when it is done with them.
+        """
+
+    def __enter__(self) -> "BaseBot":
+        return self
+
+    def __exit__(self, *args: object) -> None:
+        self.close()
+
+    def play_game(self, opponent: 'BaseBot', num_games: int,
+                  workers: int = 1, seed: Optional[int] = None,
+                  checkpoint: Optional[str] = None) -> tuple[int, int, int]:
         """
         Blokus with specific bots and return the results
 
         Inputs:
             opponent (BaseBot): The opponent bot
             num_games (int): The number of games to play
+            workers (int): The number of worker processes to spread
+                the games over (see stream_games)
+            seed (Optional[int]): The master seed of the games
+                (a random one if None, or the seed of the checkpoint)
+            checkpoint (Optional[str]): A file to checkpoint the games
+                to; if it exists, the games are resumed from it. With
+                several workers, each batch of games has its own
+                checkpoint file, next to this one
 
         Returns:
             tuple[int, int, int]: A tuple containing the 
             number of wins for self, opponent, and ties
+
+        Raises:
+            ValueError: If the checkpoint was made with another seed
         """
 
+        saved = _load_checkpoint(checkpoint) if checkpoint else None
+        if saved is not None:
+            if seed is not None and seed != saved["seed"]:
+                raise ValueError("Checkpoint was made with another seed")
+            seed = saved["seed"]
+        if seed is None:
+            seed = random.randrange(2 ** 32)
+
+        if workers <= 1:
+            return self.play_games(opponent, num_games, seed,
+                                   checkpoint=checkpoint)
+
+        if checkpoint:
+            _save_checkpoint(checkpoint, {"seed": seed,
+                                          "num_games": num_games})
+
         ties = 0
         self_wins = 0
         opponent_wins = 0
 
-        for _ in range(num_games):
-            game = Blokus(num_player=2, size=11, start_positions={(0, 0), (10, 10)})
-            current_bot = self
-            game_over = False
+        for wins, losses, draws in self.stream_games(opponent, num_games,
+                                                     workers, seed,
+                                                     checkpoint):
+            self_wins += wins
+            opponent_wins += losses
+            ties += draws
+
+        return self_wins, opponent_wins, ties
+
+    def stream_games(self, opponent: 'BaseBot', num_games: int, workers: int,
+                     seed: Optional[int] = None,
+                     checkpoint: Optional[str] = None
+                     ) -> Iterator[tuple[int, int, int]]:
+        """
+        Plays games against the opponent in a pool of worker processes.
+        The games are split into batches, each of which is played by
+        one worker, and the results of each batch are yielded as soon
+        as it completes. Since every game is seeded from the master
+        seed and its index, the merged results do not depend on the
+        number of workers.
+
+        Inputs:
+            opponent (BaseBot): The opponent bot
+            num_games (int): The number of games to play
+            workers (int): The number of worker processes
+            seed (Optional[int]): The master seed of the games
+                (a random one if None)
+            checkpoint (Optional[str]): The prefix of the checkpoint
+                files of the batches (see play_games), if any
+
+        Yields:
+            tuple[int, int, int]: The number of wins for self,
+            opponent, and ties in each batch
+        """
+
+        if seed is None:
+            seed = random.randrange(2 ** 32)
+
+        batch_size = max(1, -(-num_games // (workers * 4)))
+        batches = [min(batch_size, num_games - start)
+                   for start in range(0, num_games, batch_size)]
+
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            futures = [pool.submit(_play_batch, self, opponent, games,
+                                   seed, i * batch_size,
+                                   f"{checkpoint}.{i * batch_size}"
+                                   if checkpoint else None)
+                       for i, games in enumerate(batches)]
+            for future in as_completed(futures):
+                yield future.result()
+
+    def play_games(self, opponent: 'BaseBot', num_games: int, seed: int,
+                   first_game: int = 0,
+                   checkpoint: Optional[str] = None) -> tuple[int, int, int]:
+        """
+        Plays the games one after another in this process. Before each
+        game, both bots' random generators are seeded from the master
+        seed and the game's index (see game_rng). Both bots are closed
+        once the games are over.
+
+        With a checkpoint file, the results so far are saved after every
+        game, along with a snapshot of the game in progress (see
+        Blokus.to_bytes) and the state of both bots' random generators
+        at most every checkpoint_interval seconds. If the file holds a
+        checkpoint of the same games, they are resumed from it.
+
+        Inputs:
+            opponent (BaseBot): The opponent bot
+            num_games (int): The number of games to play
+            seed (int): The master seed of the games
+            first_game (int): The index of the first game
+            checkpoint (Optional[str]): The checkpoint file, if any
+
+        Returns:
+            tuple[int, int, int]: A tuple containing the 
+            number of wins for self, opponent, and ties
+        """
+
+        try:
+            return self._play_games(opponent, num_games, seed, first_game,
+                                    checkpoint)
+        finally:
+            self.close()
+            opponent.close()
 
-            while not game_over:
+    def _play_games(self, opponent: 'BaseBot', num_games: int, seed: int,
+                    first_game: int,
+                    checkpoint: Optional[str]) -> tuple[int, int, int]:
+        """
+        Plays the games of play_games
+        """
+
+        state: Checkpoint = {"seed": seed, "first_game": first_game,
+                             "num_games": num_games, "next_game": first_game,
+                             "results": [0, 0, 0], "game": None}
+        saved = _load_checkpoint(checkpoint) if checkpoint else None
+        if saved is not None and saved.get("seed") == seed \
+                and saved.get("first_game") == first_game \
+                and saved.get("num_games") == num_games:
+            state = cast(Checkpoint, saved)
+        last_save = time.perf_counter()
+
+        for index in range(state["next_game"], first_game + num_games):
+            if state["game"] is not None:
+                game = Blokus.from_bytes(base64.b64decode(state["game"]["position"]))
+                game.auto_retire = True
+                self.rng.setstate(_rng_state(state["game"]["rngs"][0]))
+                opponent.rng.setstate(_rng_state(state["game"]["rngs"][1]))
+            else:
+                self.rng = game_rng(seed, index, 1)
+                opponent.rng = game_rng(seed, index, 2)
+                game = Blokus(num_player=2, size=11, start_positions={(0, 0), (10, 10)},
+                              auto_retire=True)
+
+            while not game.game_over:
+                # Self plays player 1. Stuck players are retired by
+                # the game itself (see Blokus.has_legal_move), so the
+                # bots are only asked to move when they can.
+                current_bot = self if game.curr_player == 1 else opponent
                 move = current_bot.make_move(game)
                 if move:
                     game.maybe_place(move)
                 else:
                     game.retire()
 
-                current_bot = opponent if current_bot == self else self
-                game_over = game.game_over
+                if checkpoint and not game.game_over and \
+                        time.perf_counter() - last_save >= self.checkpoint_interval:
+                    state["game"] = {
+                        "position": base64.b64encode(game.to_bytes()).decode(),
+                        "rngs": [self.rng.getstate(), opponent.rng.getstate()]}
+                    _save_checkpoint(checkpoint, state)
+                    last_save = time.perf_counter()
 
             winners = game.winners
             if len(winners) == 2:
-                ties += 1
+                state["results"][2] += 1
             elif self.bot_id in winners:
-                self_wins += 1
+                state["results"][0] += 1
             else:
-                opponent_wins += 1
+                state["results"][1] += 1
 
+            state["next_game"] = index + 1
+            state["game"] = None
+            if checkpoint:
+                _save_checkpoint(checkpoint, state)
+                last_save = time.perf_counter()
+
+        self_wins, opponent_wins, ties = state["results"]
         return self_wins, opponent_wins, ties
 
+def _load_checkpoint(path: str) -> Optional[dict[str, Any]]:
+    """
+    Returns the contents of a checkpoint file, or None if there is none
+    """
+    if not os.path.exists(path):
+        return None
+    with open(path) as f:
+        return json.load(f)
+
+def _save_checkpoint(path: str, state: Mapping[str, object]) -> None:
+    """
+    Writes a checkpoint file, replacing the previous one in one step
+    so that a crash cannot leave a partial checkpoint behind
+    """
+    with open(path + ".tmp", "w") as f:
+        json.dump(state, f)
+    os.replace(path + ".tmp", path)
+
+def _rng_state(saved: list[Any]) -> tuple[Any, ...]:
+    """
+    Converts the state of a random generator, as saved in a checkpoint
+    (where JSON turned its tuples into lists), back into a state
+    """
+    version, internal, gauss = saved
+    return version, tuple(internal), gauss
+
+def game_rng(seed: int, game_index: int, player: int) -> random.Random:
+    """
+    Returns the random generator of one of the players of a game,
+    seeded from the master seed and the game's index.
+
+    Inputs:
+        seed (int): The master seed
+        game_index (int): The index of the game
+        player (int): The player (1 or 2)
+
+    Returns:
+        random.Random: A generator that is the same in every process
+    """
+    return random.Random(f"{seed}:{game_index}:{player}")
+
+def _play_batch(bot: BaseBot, opponent: BaseBot, num_games: int,
+                seed: int, first_game: int,
+                checkpoint: Optional[str] = None) -> tuple[int, int, int]:
+    """
+    Plays a batch of games in a worker process (see BaseBot.stream_games)
+    """
+    return bot.play_games(opponent, num_games, seed, first_game, checkpoint)
+
 class NBot(BaseBot):
     """
     Represents a random-playing bot (needs improvement) in Blokus
     """
 
     def make_move(self, game: Blokus) -> Piece | None:
-        available_moves = game.available_moves()
-        if available_moves:
-            return random.choice(list(available_moves))
+        # The first move of a random order is a uniformly random legal
+        # move, found without listing the others
+        move = next(game.iter_available_moves("random", self.rng), None)
+        if move is not None:
+            return move.to_piece()
         return None
 
 class SBot(BaseBot):
@@ -83,23 +344,24 @@ class SBot(BaseBot):
     """
 
     def make_move(self, game: Blokus) -> Piece | None:
-        available_moves = list(game.available_moves())
-        if available_moves:
-            random_moves = random.sample(available_moves, min(20, len(available_moves)))
-            best_move = self.evaluate_moves(random_moves)
-            return best_move
-        return None
-
-    def evaluate_moves(self, random_moves: list[Piece]) -> Piece | None:
+        # The first 20 moves of a random order are a uniform sample of
+        # (at most) 20 legal moves, evaluated as they are found
+        random_moves = islice(game.iter_available_moves("random", self.rng), 20)
+        best_move = self.evaluate_moves(random_moves)
+        if best_move is None:
+            return None
+        return best_move.to_piece()
+
+    def evaluate_moves(self, random_moves: Iterable[Move]) -> Move | None:
         """
         Evaluates the available moves and returns the best move
 
         Inputs:
-            random_moves (list[Piece]): The list of available moves.
+            random_moves (Iterable[Move]): The available moves.
             game (Blokus): The Blokus game instance
 
         Returns:
-            Piece: The best move to be placed on the board
+            Move: The best move to be placed on the board
         """
 
         best_move = None
@@ -113,12 +375,12 @@ class SBot(BaseBot):
 
         return best_move
 
-    def evaluate_move(self, move: Piece) -> int:
+    def evaluate_move(self, move: Move) -> int:
         """
         Evaluate the move based on its score by length
 
         Inputs:
-            move (Piece): The move to be evaluated
+            move (Move): The move to be evaluated
             game (Blokus): The Blokus game instance
 
         Returns:
@@ -133,23 +395,23 @@ class UBot(BaseBot):
     """
 
     def make_move(self, game: Blokus) -> Piece | None:
-        available_moves = list(game.available_moves())
-        if available_moves:
-            random_moves = random.sample(available_moves, min(20, len(available_moves)))
-            worst_move = self.evaluate_moves(random_moves)
-            return worst_move
-        return None
-
-    def evaluate_moves(self, random_moves: list[Piece]) -> Piece | None:
+        # As SBot, but keeping the smallest of the sampled moves
+        random_moves = islice(game.iter_available_moves("random", self.rng), 20)
+        worst_move = self.evaluate_moves(random_moves)
+        if worst_move is None:
+            return None
+        return worst_move.to_piece()
+
+    def evaluate_moves(self, random_moves: Iterable[Move]) -> Move | None:
         """
         Evaluates the available moves and returns the worst move
 
         Inputs:
-            random_moves (list[Piece]): The list of available moves
+            random_moves (Iterable[Move]): The available moves
             game (Blokus): The Blokus game instance
 
         Returns:
-            Piece: The best move to be placed on the board
+            Move: The best move to be placed on the board
         """
 
         worst_move = None
@@ -163,12 +425,12 @@ class UBot(BaseBot):
 
         return worst_move
 
-    def evaluate_move(self, move: Piece) -> float:
+    def evaluate_move(self, move: Move) -> float:
         """
         Evaluate the move based on its score by length
 
         Inputs:
-            move (Piece): The move to be evaluated
+            move (Move): The move to be evaluated
             game (Blokus): The Blokus game instance
 
         Returns:
@@ -177,15 +439,413 @@ class UBot(BaseBot):
 
         return len(move.squares())
 
+def ordered_moves(game: Blokus, limit: int) -> list[Move]:
+    """
+    Returns the current player's legal moves, biggest pieces first
+    and then by the number of corners gained, cut down to the first
+    `limit` of them
+
+    Inputs:
+        game (Blokus): The Blokus game instance
+        limit (int): The maximum number of moves to return
+
+    Returns:
+        list[Move]: The moves, in order
+    """
+    moves = sorted(game.legal_moves())
+    moves.sort(key=lambda move: (len(move.offsets), game.corners_gained(move)),
+               reverse=True)
+    return moves[:limit]
+
+class _OutOfTime(Exception):
+    """
+    Raised by ABBot's search when the time budget of a move runs out
+    """
+
+class ABBot(BaseBot):
+    """
+    Represents a bot that looks ahead with iterative-deepening
+    alpha-beta search in Blokus
+
+    The search assumes that every opponent plays against this bot
+    ("paranoid" search), so it also works with more than two players.
+    Moves are ordered biggest pieces first, then by the number of new
+    corners they open, and only the first max_branching of them are
+    searched at each node. The search deepens one ply at a time until
+    the time budget of the move runs out, and plays the best move of
+    the deepest completed search.
+
+    Positions reached through different move orders are only searched
+    once per depth, thanks to a transposition table indexed by the
+    engine's Zobrist keys; the best move it remembers for a position is
+    also searched first.
+    """
+
+    def __init__(self, bot_id: int, rng: Optional[random.Random] = None,
+                 move_time: float = 0.5, max_depth: int = 8,
+                 max_branching: int = 12, table_size: int = 1 << 16):
+        super().__init__(bot_id, rng)
+        self.move_time = move_time
+        self.max_depth = max_depth
+        self.max_branching = max_branching
+        self.table = TranspositionTable(table_size)
+
+        # Search statistics, accumulated over every move made
+        self.nodes = 0
+        self.search_time = 0.0
+        self.last_depth = 0
+
+        self._player = 0
+        self._deadline = 0.0
+
+    @property
+    def nodes_per_second(self) -> float:
+        """
+        Returns the number of positions searched per second, over every
+        move this bot has made
+        """
+        if self.search_time == 0:
+            return 0.0
+        return self.nodes / self.search_time
+
+    def make_move(self, game: Blokus) -> Piece | None:
+        start = time.perf_counter()
+        if game.curr_player != self._player:
+            # The stored values are relative to the player searching
+            self.table.clear()
+        self._player = game.curr_player
+        self._deadline = start + self.move_time
+        self.table.new_search()
+
+        moves = self.ordered_moves(game)
+        best_move = moves[0] if moves else None
+        self.last_depth = 0
+
+        if len(moves) > 1:
+            for depth in range(1, self.max_depth + 1):
+                try:
+                    best_move = self._search_root(game, moves, depth)
+                except _OutOfTime:
+                    break
+                self.last_depth = depth
+                # Search the best move first at the next depth
+                moves.remove(best_move)
+                moves.insert(0, best_move)
+
+        self.search_time += time.perf_counter() - start
+        if best_move is None:
+            return None
+        return best_move.to_piece()
+
+    def ordered_moves(self, game: Blokus) -> list[Move]:
+        """
+        Returns the current player's legal moves, biggest pieces first
+        and then by the number of corners gained, cut down to the first
+        max_branching of them.
+
+        Inputs:
+            game (Blokus): The Blokus game instance
+
+        Returns:
+            list[Move]: The moves to search, in order
+        """
+        return ordered_moves(game, self.max_branching)
+
+    def evaluate(self, game: Blokus) -> float:
+        """
+        Evaluates a position for this bot: its score minus the best
+        opponent score, plus (with a smaller weight) its open corners
+        minus the most open corners of an opponent. Finished games are
+        worth more than any unfinished one.
+
+        Inputs:
+            game (Blokus): The Blokus game instance
+
+        Returns:
+            float: The value of the position for this bot
+        """
+        others = [p for p in range(1, game.num_players + 1)
+                  if p != self._player]
+        score = game.get_score(self._player)
+        best_other = max((game.get_score(p) for p in others), default=0)
+
+        if game.game_over:
+            return 1000.0 * (score - best_other)
+
+        corners = len(game.corners(self._player))
+        best_corners = max((len(game.corners(p)) for p in others), default=0)
+        return 10.0 * (score - best_other) + corners - best_corners
+
+    def _search_root(self, game: Blokus, moves: list[Move], depth: int) -> Move:
+        """
+        Searches the given moves to the given depth and returns the best
+        """
+        best_move = moves[0]
+        alpha = float('-inf')
+        for move in moves:
+            game.make_move(move)
+            try:
+                value = self._search(game, depth - 1, alpha, float('inf'))
+            finally:
+                game.unmake_move()
+            if value > alpha:
+                alpha = value
+                best_move = move
+        return best_move
+
+    def _search(self, game: Blokus, depth: int, alpha: float,
+                beta: float) -> float:
+        """
+        Alpha-beta search of the current position, to the given depth
+
+        Raises _OutOfTime once the move's time budget has run out.
+        """
+        self.nodes += 1
+        if time.perf_counter() > self._deadline:
+            raise _OutOfTime()
+        if depth == 0 or game.game_over:
+            return self.evaluate(game)
+
+        key = game.key
+        alpha_orig, beta_orig = alpha, beta
+        entry = self.table.probe(key)
+        if entry is not None and entry.depth >= depth:
+            if entry.bound == EXACT:
+                return entry.value
+            if entry.bound == LOWER:
+                alpha = max(alpha, entry.value)
+            else:
+                beta = min(beta, entry.value)
+            if alpha >= beta:
+                return entry.value
+
+        maximizing = game.curr_player == self._player
+        moves: list[Optional[Move]] = list(self.ordered_moves(game))
+        if not moves:
+            # A player without moves has to retire
+            moves = [None]
+        elif entry is not None and entry.move in moves:
+            moves.remove(entry.move)
+            moves.insert(0, entry.move)
+
+        value = float('-inf') if maximizing else float('inf')
+        best_move = moves[0]
+        for move in moves:
+            game.make_move(move)
+            try:
+                child = self._search(game, depth - 1, alpha, beta)
+            finally:
+                game.unmake_move()
+            if maximizing and child > value or not maximizing and child < value:
+                value = child
+                best_move = move
+            if maximizing:
+                alpha = max(alpha, value)
+            else:
+                beta = min(beta, value)
+            if alpha >= beta:
+                break
+
+        if value <= alpha_orig:
+            bound = UPPER
+        elif value >= beta_orig:
+            bound = LOWER
+        else:
+            bound = EXACT
+        self.table.store(key, depth, value, bound, best_move)
+        return value
+
+class _Node:
+    """
+    A node of an MCTSBot search tree: the position reached by playing
+    `move` (None for a retirement) from the parent's position
+    """
+
+    __slots__ = ("move", "parent", "player", "children", "untried",
+                 "visits", "value")
+
+    def __init__(self, move: Optional[Move], parent: Optional['_Node'],
+                 player: int):
+        self.move = move
+        self.parent = parent
+        # The player who made the move leading to this node
+        self.player = player
+        self.children: list['_Node'] = []
+        # Moves not expanded yet, or None until the node is first reached
+        self.untried: Optional[list[Optional[Move]]] = None
+        self.visits = 0
+        # The total reward of self.player over the playouts through here
+        self.value = 0.0
+
+    def ucb(self, exploration: float) -> float:
+        """
+        Returns the UCT value of the node, as seen by its player
+        """
+        assert self.parent is not None
+        return (self.value / self.visits
+                + exploration * math.sqrt(math.log(self.parent.visits) / self.visits))
+
+def mcts_search(game: Blokus, simulations: int, move_time: float,
+                seed: int, max_children: int = 12,
+                exploration: float = 1.4) -> dict[Optional[Move], tuple[int, float]]:
+    """
+    Builds a Monte Carlo search tree from the current position of the
+    game, running up to `simulations` playouts for at most `move_time`
+    seconds. Only the first max_children moves of each position, as
+    ordered by ordered_moves, are expanded. Each playout picks moves
+    with game.random_move, and the game is restored with unmake_move
+    afterwards. Winning a playout is worth 1 to a player, and ties are
+    shared.
+
+    Inputs:
+        game (Blokus): The Blokus game instance
+        simulations (int): The maximum number of playouts
+        move_time (float): The time budget, in seconds
+        seed (int): The seed of the playouts
+        max_children (int): The maximum number of children of a node
+        exploration (float): The UCT exploration constant
+
+    Returns:
+        dict: The number of visits and total reward of each root move
+    """
+    rng = random.Random(seed)
+    deadline = time.perf_counter() + move_time
+    root = _Node(None, None, 0)
+
+    for _ in range(simulations):
+        if time.perf_counter() > deadline:
+            break
+        node = root
+        made = 0
+
+        # Selection
+        while node.untried == [] and node.children:
+            node = max(node.children, key=lambda child: child.ucb(exploration))
+            game.make_move(node.move)
+            made += 1
+
+        # Expansion
+        if node.untried is None and not game.game_over:
+            moves: list[Optional[Move]] = list(ordered_moves(game, max_children))
+            # Expand the best ordered moves first
+            moves.reverse()
+            node.untried = moves or [None]
+        if node.untried:
+            move = node.untried.pop()
+            child = _Node(move, node, game.curr_player)
+            node.children.append(child)
+            game.make_move(move)
+            made += 1
+            node = child
+
+        # Playout
+        while not game.game_over:
+            game.make_move(game.random_move(rng))
+            made += 1
+        winners = game.winners
+        for _ in range(made):
+            game.unmake_move()
+
+        # Backpropagation
+        backed: Optional[_Node] = node
+        while backed is not None:
+            backed.visits += 1
+            if backed.player in winners:
+                backed.value += 1 / len(winners)
+            backed = backed.parent
+
+    return {child.move: (child.visits, child.value) for child in root.children}
+
+class MCTSBot(BaseBot):
+    """
+    Represents a Monte Carlo Tree Search bot in Blokus
+
+    Each move is chosen by running playouts from the current position,
+    with moves picked by the engine's fast random_move rollout policy.
+    Only the most promising max_children moves of each position (see
+    ordered_moves) are added to the tree.
+    With more than one worker, the search is root-parallel: every worker
+    process grows its own tree from the same position with its own seed,
+    and the visit counts of the root moves are added up. The most
+    visited move is played.
+    """
+
+    def __init__(self, bot_id: int, rng: Optional[random.Random] = None,
+                 simulations: int = 1000, move_time: float = 1.0,
+                 workers: int = 1, max_children: int = 12):
+        super().__init__(bot_id, rng)
+        self.simulations = simulations
+        self.move_time = move_time
+        self.workers = workers
+        self.max_children = max_children
+        self._pool: Optional[ProcessPoolExecutor] = None
+
+    def __getstate__(self) -> dict:
+        # The pool cannot be sent to other processes
+        state = self.__dict__.copy()
+        state["_pool"] = None
+        return state
+
+    def close(self) -> None:
+        """
+        Shuts down the worker processes, if any
+        """
+        if self._pool is not None:
+            self._pool.shutdown()
+            self._pool = None
+
+    def make_move(self, game: Blokus) -> Piece | None:
+        seeds = [self.rng.randrange(2 ** 32) for _ in range(self.workers)]
+        per_worker = -(-self.simulations // self.workers)
+
+        if self.workers <= 1:
+            results = [mcts_search(game, self.simulations, self.move_time,
+                                   seeds[0], self.max_children)]
+        else:
+            if self._pool is None:
+                self._pool = ProcessPoolExecutor(max_workers=self.workers)
+            futures = [self._pool.submit(mcts_search, game, per_worker,
+                                         self.move_time, seed,
+                                         self.max_children)
+                       for seed in seeds]
+            results = [future.result() for future in futures]
+
+        visits: dict[Optional[Move], int] = {}
+        for result in results:
+            for move, (count, _) in result.items():
+                visits[move] = visits.get(move, 0) + count
+
+        if not visits:
+            return None
+        best_move = max(sorted(visits, key=lambda m: (m is None, m)),
+                        key=lambda move: visits[move])
+        if best_move is None:
+            return None
+        return best_move.to_piece()
+
 @click.command()
 @click.option('-n', '--num-games', default=20, type=int, \
 help='Number of games to play.')
 @click.option('-1', '--player1', default='N', \
-type=click.Choice(['S', 'N', 'U']), help='Strategy for player 1.')
+type=click.Choice(['S', 'N', 'U', 'A', 'M']), help='Strategy for player 1.')
 @click.option('-2', '--player2', default='N', \
-type=click.Choice(['S', 'N', 'U']), help='Strategy for player 2.')
-
-def main(num_games: int, player1: str, player2: str) -> str:
+type=click.Choice(['S', 'N', 'U', 'A', 'M']), help='Strategy for player 2.')
+@click.option('-w', '--workers', default=1, type=int, \
+help='Number of worker processes to play the games in.')
+@click.option('--seed', default=None, type=int, \
+help='Master seed of the games (random if not given).')
+@click.option('-t', '--move-time', default=0.5, type=float, \
+help='Time budget, in seconds, of each move of the search bots (A, M).')
+@click.option('--simulations', default=1000, type=int, \
+help='Maximum number of playouts per move of the MCTS bot (M).')
+@click.option('--rollout-workers', default=1, type=int, \
+help='Number of processes running the MCTS bot\'s playouts (M).')
+@click.option('--checkpoint', default=None, type=str, \
+help='File to checkpoint the games to, and resume them from.')
+
+def main(num_games: int, player1: str, player2: str, workers: int,
+         seed: Optional[int], move_time: float, simulations: int,
+         rollout_workers: int, checkpoint: Optional[str]) -> str:
     """
     Run to play Blokus games with specified strategies
 
@@ -193,14 +853,31 @@ def main(num_games: int, player1: str, player2: str) -> str:
         num_games (int): Number of games to play
         player1 (str): Strategy for player 1
         player2 (str): Strategy for player 2
+        workers (int): Number of worker processes
+        seed (Optional[int]): Master seed of the games
+        move_time (float): Time budget of each move of the search bots
+        simulations (int): Maximum number of playouts of the MCTS bot
+        rollout_workers (int): Number of playout processes of the MCTS bot
+        checkpoint (Optional[str]): File to checkpoint the games to
     """
 
-    strategies = {'N': NBot, 'S': SBot, 'U': UBot}
+    strategies = {'N': NBot, 'S': SBot, 'U': UBot, 'A': ABBot, 'M': MCTSBot}
 
-    bot1 = strategies[player1](bot_id=1)
-    bot2 = strategies[player2](bot_id=2)
+    bots: list[BaseBot] = []
+    for bot_id, strategy in ((1, player1), (2, player2)):
+        if strategy == 'A':
+            bots.append(ABBot(bot_id=bot_id, move_time=move_time))
+        elif strategy == 'M':
+            bots.append(MCTSBot(bot_id=bot_id, simulations=simulations,
+                                move_time=move_time, workers=rollout_workers))
+        else:
+            bots.append(strategies[strategy](bot_id=bot_id))
+    bot1, bot2 = bots
 
-    bot1_wins, bot2_wins, ties = bot1.play_game(bot2, num_games)
+    start = time.perf_counter()
+    bot1_wins, bot2_wins, ties = bot1.play_game(bot2, num_games, workers, seed,
+                                                checkpoint)
+    elapsed = time.perf_counter() - start
 
     total_games = num_games
     ties_percentage = (ties / total_games) * 100
@@ -210,6 +887,15 @@ def main(num_games: int, player1: str, player2: str) -> str:
     print(f"Bot 1 ({player1}) Wins | {bot1_win_percentage:.2f} %")
     print(f"Bot 2 ({player2}) Wins | {bot2_win_percentage:.2f} %")
     print(f"Ties           | {ties_percentage:.2f} %")
+    print(f"Games/second   | {num_games / elapsed:.2f}")
+
+    # Search statistics are only collected in this process
+    for bot, strategy in ((bot1, player1), (bot2, player2)):
+        if isinstance(bot, ABBot) and workers <= 1:
+            print(f"Bot {bot.bot_id} ({strategy}) Nodes/second | "
+                  f"{bot.nodes_per_second:.2f}")
+            print(f"Bot {bot.bot_id} ({strategy}) Table hits   | "
+                  f"{bot.table.hit_rate * 100:.2f} %")
 
 if __name__ == "__main__":
     main()
@@ -187,7 +187,7 @@ class Blokus_gui:
 
         for enum_i, ls_shapes in enumerate(self.game.shapes):
 
-            squares = self.game.player_shapes_dict[curr_player][ls_shapes]
+            squares = self.game.shapes[ls_shapes]
             remaining = self.game.remaining_shapes(curr_player)
             
             for_text = []
@@ -210,29 +210,27 @@ class Blokus_gui:
             text = self.font.render(ls_shapes.value,True,col)
             self.surface.blit(text, center)
     
-    def pending_piece(self, shape:Shape, r_anchor: int, c_anchor: int) -> Piece: 
+    def pending_piece(self, piece:Piece, r_anchor: int, c_anchor: int) -> Piece: 
         """
-        Given a shape and its anchor points, it will return piece and displays the piece
-        in a Blue color, which is distinct from the player's pieces 
+        Given a piece and its anchor points, it will anchor the piece there and 
+        display it in a Blue color, which is distinct from the player's pieces 
 
         Inputs: 
-            shape, a Shape 
+            piece, a Piece 
             r_anchor, an int 
             c_anchor, an int 
         
-        Returns, a Piece 
+        Returns, the Piece 
         """
      
-        shape_piece = Piece(shape)
-        shape_piece.set_anchor((r_anchor,c_anchor))
+        piece.set_anchor((r_anchor,c_anchor))
 
-        for points in shape.squares:
+        for points in piece.squares():
             r,c = points 
-            rect = (self.op_grid(c+shape_piece.anchor[1]),
-                    self.op_grid(r+shape_piece.anchor[0]))
+            rect = (self.op_grid(c), self.op_grid(r))
             self.draw_box(rect,color=(0,0,139))
 
-        return shape_piece
+        return piece
     
 
     def display_starting(self) -> None:
@@ -266,22 +264,27 @@ class Blokus_gui:
                     self.draw_box((row))   
     
     
-    def check_walls(self,shape:Shape, 
+    def check_walls(self,piece:Piece, 
                            r_anchor: int, c_anchor: int) -> bool:
         """
-        Checks if a given shape has collided with the wall. Used when rotating, flipping or 
-        choosing a piece. If there is a wall collision it will return True
+        Checks if a given piece, in its current orientation, would collide with 
+        the wall at the given anchor. Used when rotating, flipping or choosing a 
+        piece. If there is a wall collision it will return True. The piece keeps 
+        its anchor.
         
         Input: 
-            shape, A Shape
+            piece, A Piece
             r_anchor, an int 
             c_anchor, an int 
         
         Returns, a boolean
         """
-        piece = Piece(shape)
+        anchor = piece.anchor
         piece.set_anchor((r_anchor, c_anchor))
-        return self.game.any_wall_collisions(piece)
+        collides = self.game.any_wall_collisions(piece)
+        if anchor is not None:
+            piece.set_anchor(anchor)
+        return collides
     
     def game_is_over(self) -> None:
         """
@@ -305,8 +308,11 @@ class Blokus_gui:
         Game event as defined by the blokus specifications
         """
         chosen = random.choice(self.game.remaining_shapes(self.game.curr_player)) 
-        this_shape = self.game.player_shapes_dict[self.game.curr_player][chosen]
+        # The pending piece is oriented on its own, so the game's shape
+        # keeps its orientation
+        this_piece = Piece(self.game.shapes[chosen])
         r_anchor, c_anchor = (self.grid_size//2,self.grid_size//2) 
+        this_piece.set_anchor((r_anchor, c_anchor))
         
         while True:   
             events = pygame.event.get()
@@ -314,7 +320,7 @@ class Blokus_gui:
             self.curr_player_pieces()
             self.display_starting()
             self.display_player_score()
-            this_piece = self.pending_piece(this_shape, r_anchor,c_anchor)
+            this_piece = self.pending_piece(this_piece, r_anchor,c_anchor)
             self.game_is_over()
   
             for event in events: 
@@ -327,40 +333,40 @@ class Blokus_gui:
                     new = str(event.dict["unicode"]).upper()
                     for kind in self.game.remaining_shapes(self.game.curr_player):
                         if new == kind.value:
-                            new_shape = self.game.player_shapes_dict[self.game.curr_player][kind]
-                            if not self.check_walls(new_shape,r_anchor,c_anchor):
-                                this_shape = new_shape
+                            new_piece = Piece(self.game.shapes[kind])
+                            if not self.check_walls(new_piece,r_anchor,c_anchor):
+                                this_piece = new_piece
                   
                     if event.key == pygame.K_UP: 
-                        if not self.check_walls(this_shape,r_anchor-1,c_anchor):               
+                        if not self.check_walls(this_piece,r_anchor-1,c_anchor):               
                             r_anchor += -1 
 
                     if event.key == pygame.K_DOWN:
-                        if not self.check_walls(this_shape,r_anchor+1,c_anchor):               
+                        if not self.check_walls(this_piece,r_anchor+1,c_anchor):               
                             r_anchor += 1 
     
                     if event.key == pygame.K_LEFT:
-                        if not self.check_walls(this_shape,r_anchor,c_anchor-1):               
+                        if not self.check_walls(this_piece,r_anchor,c_anchor-1):               
                             c_anchor += -1 
             
                     if event.key == pygame.K_RIGHT:
-                        if not self.check_walls(this_shape,r_anchor,c_anchor+1):               
+                        if not self.check_walls(this_piece,r_anchor,c_anchor+1):               
                             c_anchor += 1 
 
                     if event.key == pygame.K_r:
-                        this_shape.rotate_right()
-                        if self.check_walls(this_shape,r_anchor,c_anchor):
-                            this_shape.rotate_left()
+                        this_piece.rotate_right()
+                        if self.check_walls(this_piece,r_anchor,c_anchor):
+                            this_piece.rotate_left()
 
                     if event.key == pygame.K_e:
-                        this_shape.rotate_left() 
-                        if self.check_walls(this_shape,r_anchor,c_anchor):
-                            this_shape.rotate_right()
+                        this_piece.rotate_left() 
+                        if self.check_walls(this_piece,r_anchor,c_anchor):
+                            this_piece.rotate_right()
 
                     if event.key == pygame.K_SPACE:
-                        this_shape.flip_horizontally() 
-                        if self.check_walls(this_shape,r_anchor,c_anchor):
-                            this_shape.flip_horizontally()
+                        this_piece.flip_horizontally() 
+                        if self.check_walls(this_piece,r_anchor,c_anchor):
+                            this_piece.flip_horizontally()
 
                     if event.key == pygame.K_6:
                         if self.game.maybe_place(this_piece): 
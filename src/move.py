@@ -0,0 +1,147 @@
+"""
+Compact, immutable representation of a Blokus move.
+
+A Piece carries its own Shape and is mutable, which makes it a poor fit
+for sets of moves or for dictionary keys. A Move only records which
+shape is played, in which of its orientations (an index into
+orientations.ORIENTATIONS), and where: the anchor is the board position
+of the orientation's origin, exactly as for the corresponding Piece.
+"""
+
+from typing import Any, Optional
+
+from shape_definitions import ShapeKind
+from piece import Point, Shape, Piece, shape_registry
+from orientations import (ORIENTATIONS, ORIENTATION_TRANSFORMS,
+                          ORIENTATION_LIST, ORIENTATION_INDEX, normalize)
+
+# Orientation code standing for a retirement in stored move lists
+RETIRE_CODE = 255
+
+# Maps the normalized offsets of every orientation to its index
+_ORIENTATION_LOOKUP: dict[ShapeKind, dict[tuple[Point, ...], int]] = {
+    kind: {normalize(offsets): j for j, offsets in enumerate(orientations)}
+    for kind, orientations in ORIENTATIONS.items()
+}
+
+
+class Move:
+    """
+    A shape kind, an orientation index and an anchor. Moves compare
+    and hash by value, and cannot be modified once created.
+    """
+
+    __slots__ = ("kind", "orientation", "anchor")
+
+    kind: ShapeKind
+    orientation: int
+    anchor: Point
+
+    def __init__(self, kind: ShapeKind, orientation: int,
+                 anchor: Point) -> None:
+        """
+        Constructor
+
+        Raises ValueError if the shape has no such orientation.
+        """
+        if not 0 <= orientation < len(ORIENTATIONS[kind]):
+            raise ValueError(f"Shape {kind} has no orientation {orientation}")
+        object.__setattr__(self, "kind", kind)
+        object.__setattr__(self, "orientation", orientation)
+        object.__setattr__(self, "anchor", anchor)
+
+    def __setattr__(self, name: str, value: Any) -> None:
+        raise AttributeError("Move objects are immutable")
+
+    def __delattr__(self, name: str) -> None:
+        raise AttributeError("Move objects are immutable")
+
+    def __eq__(self, other: object) -> bool:
+        if not isinstance(other, Move):
+            return NotImplemented
+        return (self.kind is other.kind
+                and self.orientation == other.orientation
+                and self.anchor == other.anchor)
+
+    def __hash__(self) -> int:
+        return hash((self.kind, self.orientation, self.anchor))
+
+    def __lt__(self, other: "Move") -> bool:
+        """
+        Orders moves by shape kind, orientation and anchor, so that sets
+        of moves can be sorted into an order that, unlike their iteration
+        order, does not change from one process to the next.
+        """
+        return ((self.kind.value, self.orientation, self.anchor)
+                < (other.kind.value, other.orientation, other.anchor))
+
+    def __repr__(self) -> str:
+        return f"Move({self.kind}, {self.orientation}, {self.anchor})"
+
+    def __reduce__(self) -> tuple[type, tuple[ShapeKind, int, Point]]:
+        return (Move, (self.kind, self.orientation, self.anchor))
+
+    @property
+    def offsets(self) -> tuple[Point, ...]:
+        """
+        Returns the offsets of the move's orientation.
+        """
+        return ORIENTATIONS[self.kind][self.orientation]
+
+    @property
+    def code(self) -> int:
+        """
+        Returns the orientation code of the move: the index of its kind
+        and orientation in orientations.ORIENTATION_LIST.
+        """
+        return ORIENTATION_INDEX[(self.kind, self.orientation)]
+
+    @staticmethod
+    def from_code(code: int, anchor: Point) -> "Move":
+        """
+        Returns the move with the given orientation code and anchor.
+
+        Raises ValueError if there is no such orientation code.
+        """
+        if not 0 <= code < len(ORIENTATION_LIST):
+            raise ValueError(f"Invalid orientation code {code}")
+        kind, orientation = ORIENTATION_LIST[code]
+        return Move(kind, orientation, anchor)
+
+    def squares(self) -> list[Point]:
+        """
+        Returns the list of board positions covered by the move.
+        """
+        r, c = self.anchor
+        return [(r + dr, c + dc) for dr, dc in self.offsets]
+
+    def to_piece(self, shape: Optional[Shape] = None) -> Piece:
+        """
+        Builds the Piece for this move from the given shape, which must
+        be the (untransformed) shape of the move's kind, or by default
+        from the shape of the registry (see piece.shape_registry).
+        """
+        if shape is None:
+            shape = shape_registry()[self.kind]
+        face_up, rotation = ORIENTATION_TRANSFORMS[self.kind][self.orientation]
+        piece = Piece(shape, face_up, rotation)
+        piece.set_anchor(self.anchor)
+        return piece
+
+    @staticmethod
+    def from_piece(piece: Piece) -> "Move":
+        """
+        Returns the Move covering the same squares as the given piece.
+
+        Raises ValueError if the piece does not have an anchor.
+        """
+        squares = piece.squares()
+        offsets = normalize(tuple(squares))
+        kind = piece.shape.kind
+        j = _ORIENTATION_LOOKUP[kind][offsets]
+
+        # The piece's squares are those of the orientation, shifted
+        rep = ORIENTATIONS[kind][j]
+        anchor = (min(r for r, _ in squares) - min(r for r, _ in rep),
+                  min(c for _, c in squares) - min(c for _, c in rep))
+        return Move(kind, j, anchor)
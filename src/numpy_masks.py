@@ -0,0 +1,174 @@
+"""
+NumPy computation of every legal placement on a Blokus board at once.
+
+The board is held as a (size x size) uint8 array of player numbers (0
+for an empty cell). For each orientation of each shape (see
+orientations.py), the number of occupied cells under the piece, of the
+player's cells along its edges, of the player's cells touching its
+corners, and of start positions under it, is computed for every
+position of the piece in one pass of sliding-window sums: one shifted
+slice of the board is added up per square, edge cell and corner cell of
+the orientation. The legal positions are then those where these counts
+satisfy the same rules as Blokus.legal_to_place.
+
+Masks are indexed by the top-left corner of the orientation's bounding
+box rather than by its anchor, since anchors may lie off the board (see
+anchor_of).
+
+This module requires NumPy, which is only needed for analysis tooling:
+the game engines do not import it (see Blokus.legal_anchor_masks).
+"""
+
+from typing import Optional
+
+import numpy as np
+
+from shape_definitions import ShapeKind
+from piece import Point
+from base import BlokusBase
+from blokus import Blokus
+from orientations import ORIENTATIONS, Offsets
+from move import Move
+
+CARDINALS: list[Point] = [(-1, 0), (1, 0), (0, -1), (0, 1)]
+INTERCARDINALS: list[Point] = [(-1, -1), (-1, 1), (1, -1), (1, 1)]
+
+
+class Stencil:
+    """
+    An orientation translated so that its bounding box starts at (0, 0):
+    its squares, the cells along its edges and the cells touching its
+    corners, and the size of its bounding box.
+    """
+
+    __slots__ = ("squares", "edges", "corners", "height", "width", "origin")
+
+    def __init__(self, offsets: Offsets) -> None:
+        """
+        Constructor
+        """
+        min_r = min(r for r, _ in offsets)
+        min_c = min(c for _, c in offsets)
+        squares = {(r - min_r, c - min_c) for r, c in offsets}
+        edges = {(r + dr, c + dc) for r, c in squares
+                 for dr, dc in CARDINALS} - squares
+        corners = {(r + dr, c + dc) for r, c in squares
+                   for dr, dc in INTERCARDINALS} - squares - edges
+
+        self.squares: list[Point] = sorted(squares)
+        self.edges: list[Point] = sorted(edges)
+        self.corners: list[Point] = sorted(corners)
+        self.height: int = max(r for r, _ in squares) + 1
+        self.width: int = max(c for _, c in squares) + 1
+        # Offset from the top-left corner of the bounding box to the anchor
+        self.origin: Point = (min_r, min_c)
+
+
+# STENCILS[kind][j] is the Stencil of ORIENTATIONS[kind][j]
+STENCILS: dict[ShapeKind, list[Stencil]] = {
+    kind: [Stencil(offsets) for offsets in orientations]
+    for kind, orientations in ORIENTATIONS.items()
+}
+
+
+def board_array(game: BlokusBase) -> np.ndarray:
+    """
+    Returns the game's grid as a (size x size) uint8 array holding the
+    player occupying each cell, or 0 for empty cells.
+    """
+    board = np.zeros((game.size, game.size), dtype=np.uint8)
+    for r, row in enumerate(game.grid):
+        for c, cell in enumerate(row):
+            if cell is not None:
+                board[r, c] = cell[0]
+    return board
+
+
+def window_sums(padded: np.ndarray, cells: list[Point], rows: int,
+                cols: int) -> np.ndarray:
+    """
+    Adds up, for every top-left position (r, c) of a (rows x cols)
+    range, the values of the padded array at (r + dr, c + dc) for each
+    (dr, dc) in cells. The array must be padded by one cell on every
+    side, so that cells may be one step outside the bounding box.
+
+    Only the last two axes are summed over, so a stack of boards is
+    handled in the same pass (see batch.py).
+    """
+    total = np.zeros(padded.shape[:-2] + (rows, cols), dtype=np.uint8)
+    for dr, dc in cells:
+        total += padded[..., 1 + dr:1 + dr + rows, 1 + dc:1 + dc + cols]
+    return total
+
+
+def anchor_of(kind: ShapeKind, orientation: int, top_left: Point) -> Point:
+    """
+    Returns the anchor of the Move placing the given orientation with
+    its bounding box's top-left corner at top_left.
+    """
+    dr, dc = STENCILS[kind][orientation].origin
+    return top_left[0] - dr, top_left[1] - dc
+
+
+def legal_anchor_masks(game: Blokus, player: Optional[int] = None,
+                       opening: Optional[bool] = None,
+                       ) -> dict[ShapeKind, list[np.ndarray]]:
+    """
+    Computes where every orientation of every shape the player has left
+    can be legally placed.
+
+    Inputs:
+        game, the game
+        player, an int (the current player by default)
+        opening, whether the placement must follow the rules of the
+            opening moves (by default, whether the game is still in
+            them)
+
+    Returns, for each remaining shape kind, a list holding, for each
+    orientation of ORIENTATIONS[kind], a (size x size) boolean array
+    that is True at (r, c) if the orientation fits with the top-left
+    corner of its bounding box at (r, c)
+    """
+    if player is None:
+        player = game.curr_player
+    if opening is None:
+        opening = game.num_moves < game.num_players
+    size = game.size
+
+    board = board_array(game)
+    occupied = np.pad(board != 0, 1).astype(np.uint8)
+    own = np.pad(board == player, 1).astype(np.uint8)
+    start = np.zeros((size + 2, size + 2), dtype=np.uint8)
+    for r, c in game.start_positions:
+        if 0 <= r < size and 0 <= c < size:
+            start[r + 1, c + 1] = 1
+
+    masks: dict[ShapeKind, list[np.ndarray]] = {}
+    for kind in game.remaining_shapes(player):
+        masks[kind] = []
+        for stencil in STENCILS[kind]:
+            mask = np.zeros((size, size), dtype=bool)
+            rows = size - stencil.height + 1
+            cols = size - stencil.width + 1
+            if rows > 0 and cols > 0:
+                fits = ((window_sums(occupied, stencil.squares, rows, cols) == 0)
+                        & (window_sums(own, stencil.edges, rows, cols) == 0))
+                if opening:
+                    fits &= window_sums(start, stencil.squares, rows, cols) == 1
+                else:
+                    fits &= window_sums(own, stencil.corners, rows, cols) > 0
+                mask[:rows, :cols] = fits
+            masks[kind].append(mask)
+    return masks
+
+
+def masks_to_moves(masks: dict[ShapeKind, list[np.ndarray]]) -> set[Move]:
+    """
+    Returns the Moves described by the masks of legal_anchor_masks.
+    """
+    moves: set[Move] = set()
+    for kind, by_orientation in masks.items():
+        for j, mask in enumerate(by_orientation):
+            for r, c in zip(*np.nonzero(mask)):
+                moves.add(Move(kind, j, anchor_of(kind, j, (int(r), int(c)))))
+    return moves
@@ -0,0 +1,121 @@
+"""
+Precomputed orientations of the 21 Blokus shapes.
+
+Each shape can be flipped and rotated into (at most) eight orientations.
+Rather than transforming Shape objects in place, the tables below hold
+every orientation as an immutable, sorted tuple of (row, col) offsets
+relative to the shape's origin. They are built once, when this module
+is imported, from the string representations in shape_definitions.py.
+
+    SYMMETRIES[kind][i] is the orientation produced by TRANSFORMS[i],
+    that is, by Piece(shape, face_up, rotation). It always has eight
+    entries, some of which may describe the same orientation.
+
+    ORIENTATIONS[kind] keeps only the distinct orientations. Two
+    symmetries are the same orientation when their squares differ
+    only by a translation, so symmetric shapes such as X, LETTER_O
+    and ONE collapse to a single orientation. There are 91 distinct
+    orientations across the 21 shapes.
+
+    ORIENTATION_TRANSFORMS[kind][j] is the (face_up, rotation) pair
+    that produces ORIENTATIONS[kind][j].
+
+    SYMMETRY_TO_ORIENTATION[kind][i] is the index into ORIENTATIONS[kind]
+    of the orientation produced by TRANSFORMS[i].
+
+    ORIENTATION_LIST holds the (kind, j) pairs of all orientations of
+    all shapes, in the order of KINDS, and ORIENTATION_INDEX maps each
+    pair back to its position in the list. The position is a compact
+    code for an orientation, used to store moves (see selfplay.py).
+"""
+
+from shape_definitions import ShapeKind
+from piece import Point, shape_registry
+
+Offsets = tuple[Point, ...]
+
+# All eight (face_up, rotation) arguments accepted by Piece, in the order
+# used to index SYMMETRIES
+TRANSFORMS: tuple[tuple[bool, int], ...] = tuple(
+    (face_up, rotation) for face_up in (True, False) for rotation in range(4)
+)
+
+
+def transform(squares: list[Point] | Offsets, face_up: bool,
+              rotation: int) -> Offsets:
+    """
+    Applies the same transformations as Piece(shape, face_up, rotation):
+    a horizontal flip if not face_up, followed by rotation (modulo 4)
+    right rotations, all about the origin.
+
+    Inputs:
+        squares, the offsets of a shape
+        face_up, a bool
+        rotation, an int
+
+    Returns, the sorted transformed offsets
+    """
+    result = list(squares)
+    if not face_up:
+        result = [(-r, c) for r, c in result]
+    for _ in range(rotation % 4):
+        result = [(c, -r) for r, c in result]
+    return tuple(sorted(result))
+
+
+def normalize(offsets: Offsets) -> Offsets:
+    """
+    Translates the offsets so that the smallest row and column are both
+    zero. Two orientations are the same if their normalized offsets are.
+    """
+    min_r = min(r for r, _ in offsets)
+    min_c = min(c for _, c in offsets)
+    return tuple(sorted((r - min_r, c - min_c) for r, c in offsets))
+
+
+SYMMETRIES: dict[ShapeKind, tuple[Offsets, ...]] = {}
+ORIENTATIONS: dict[ShapeKind, tuple[Offsets, ...]] = {}
+ORIENTATION_TRANSFORMS: dict[ShapeKind, tuple[tuple[bool, int], ...]] = {}
+SYMMETRY_TO_ORIENTATION: dict[ShapeKind, tuple[int, ...]] = {}
+
+
+def _build_tables() -> None:
+    """
+    Fills in the tables above from the shapes of shape_definitions.py.
+    """
+    for kind, shape in shape_registry().items():
+        squares = shape.squares
+        symmetries = tuple(transform(squares, face_up, rotation)
+                           for face_up, rotation in TRANSFORMS)
+
+        seen: dict[Offsets, int] = {}
+        orientations: list[Offsets] = []
+        transforms: list[tuple[bool, int]] = []
+        indices: list[int] = []
+        for i, offsets in enumerate(symmetries):
+            key = normalize(offsets)
+            if key not in seen:
+                seen[key] = len(orientations)
+                orientations.append(offsets)
+                transforms.append(TRANSFORMS[i])
+            indices.append(seen[key])
+
+        SYMMETRIES[kind] = symmetries
+        ORIENTATIONS[kind] = tuple(orientations)
+        ORIENTATION_TRANSFORMS[kind] = tuple(transforms)
+        SYMMETRY_TO_ORIENTATION[kind] = tuple(indices)
+
+
+_build_tables()
+
+NUM_ORIENTATIONS: int = sum(len(o) for o in ORIENTATIONS.values())
+
+# All shape kinds, in definition order
+KINDS: tuple[ShapeKind, ...] = tuple(ShapeKind)
+
+ORIENTATION_LIST: tuple[tuple[ShapeKind, int], ...] = tuple(
+    (kind, j) for kind in KINDS for j in range(len(ORIENTATIONS[kind]))
+)
+ORIENTATION_INDEX: dict[tuple[ShapeKind, int], int] = {
+    pair: k for k, pair in enumerate(ORIENTATION_LIST)
+}
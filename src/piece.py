@@ -1,11 +1,10 @@
 """
 Blokus shapes and pieces.
 """
-import copy
 from typing import *
 import textwrap
 
-from shape_definitions import ShapeKind
+from shape_definitions import ShapeKind, definitions
 
 Point = tuple[int, int]
 
@@ -64,6 +63,14 @@ class Shape:
                 squares = {list(map(str, self.squares))}
         """
 
+    def copy(self) -> "Shape":
+        """
+        Returns a copy of the shape that can be flipped and rotated in
+        place without affecting this one.
+        """
+        return Shape(self.kind, self.origin, self.can_be_transformed,
+                     list(self.squares))
+
     @staticmethod
     def from_string(kind: ShapeKind, definition: str) -> "Shape":
         """
@@ -146,54 +153,232 @@ class Shape:
             y, x = square
             self.squares[i] = (x, -y)
 
+class FrozenShape(Shape):
+    """
+    A Shape that cannot be flipped or rotated in place. The shapes of
+    the shape registry (see shape_registry) are frozen, since every
+    game in the process shares them; use a Piece to orient a shape, or
+    a copy (see Shape.copy) to transform it in place.
+    """
+
+    def flip_horizontally(self) -> None:
+        """
+        Raises ValueError: registered shapes cannot be transformed
+        """
+        raise ValueError(f"Shape {self.kind} is shared and cannot be flipped")
+
+    def rotate_left(self) -> None:
+        """
+        Raises ValueError: registered shapes cannot be transformed
+        """
+        raise ValueError(f"Shape {self.kind} is shared and cannot be rotated")
+
+    def rotate_right(self) -> None:
+        """
+        Raises ValueError: registered shapes cannot be transformed
+        """
+        raise ValueError(f"Shape {self.kind} is shared and cannot be rotated")
+
+
+def _parse_shapes() -> dict[ShapeKind, Shape]:
+    """
+    Parses the shapes of shape_definitions.py into frozen shapes.
+    """
+    registry: dict[ShapeKind, Shape] = {}
+    for kind, definition in definitions.items():
+        shape = Shape.from_string(kind, definition)
+        registry[kind] = FrozenShape(shape.kind, shape.origin,
+                                     shape.can_be_transformed, shape.squares)
+    return registry
+
+
+# The shapes of shape_definitions.py, parsed once, when this module is
+# imported
+_REGISTRY: dict[ShapeKind, Shape] = _parse_shapes()
+
+
+def shape_registry() -> dict[ShapeKind, Shape]:
+    """
+    Returns the 21 shapes defined in shape_definitions.py, keyed by
+    kind. They are shared by every game engine in the process, so the
+    returned dict and its (frozen) shapes must not be modified.
+    """
+    return _REGISTRY
+
+
+class Footprint:
+    """
+    The squares covered by a piece at its current anchor and orientation,
+    together with their cardinal neighbors (edges) and intercardinal
+    neighbors (corners), as computed by Piece.footprint.
+    """
+
+    __slots__ = ("squares", "edges", "corners")
+
+    squares: frozenset[Point]
+    edges: frozenset[Point]
+    corners: frozenset[Point]
+
+    def __init__(
+        self,
+        squares: frozenset[Point],
+        edges: frozenset[Point],
+        corners: frozenset[Point],
+    ) -> None:
+        """
+        Constructor
+        """
+        self.squares = squares
+        self.edges = edges
+        self.corners = corners
+
+    @staticmethod
+    def of(squares: list[Point]) -> "Footprint":
+        """
+        Computes the footprint of a piece covering the given squares.
+        """
+        covered = frozenset(squares)
+
+        cardinal_pieces = set()
+        for y, x in covered:
+            cardinal_pieces.add((max(y-1, 0), x))
+            cardinal_pieces.add((y, max(x - 1, 0)))
+            cardinal_pieces.add((y, x+1))
+            cardinal_pieces.add((y+1, x))
+        edges = frozenset(cardinal_pieces - covered)
+
+        diagnols = set()
+        for r, c in covered:
+            diagnols.update({(r - 1, c - 1), (r + 1, c + 1),
+                             (r + 1, c - 1), (r - 1, c + 1)})
+        corners = frozenset(diagnols - covered - edges)
+
+        return Footprint(covered, edges, corners)
+
+
+class _Orientations:
+    """
+    The eight orientations of a shape that Piece flips and rotations
+    can reach, shared by every Piece made from an equal shape (see
+    _orientations_of).
+
+    Orientation i is the shape flipped (if i >= 4) and then rotated
+    right i % 4 times, which is what Piece(shape, i < 4, i % 4) gives.
+    The squares of each orientation are in the same order as those of
+    the shape, as if it had been transformed in place.
+    """
+
+    __slots__ = ("kind", "origin", "can_be_transformed", "squares")
+
+    def __init__(self, shape: Shape) -> None:
+        """
+        Constructor
+        """
+        self.kind = shape.kind
+        self.origin = shape.origin
+        self.can_be_transformed = shape.can_be_transformed
+
+        squares: list[tuple[Point, ...]] = []
+        for flipped in (False, True):
+            current = [(-y, x) if flipped else (y, x) for y, x in shape.squares]
+            for _ in range(4):
+                squares.append(tuple(current))
+                current = [(x, -y) for y, x in current]
+        self.squares: tuple[tuple[Point, ...], ...] = tuple(squares)
+
+
+# Orientations of every shape a Piece has been made from, keyed by the
+# shape's kind, origin, flag and squares
+_ORIENTATIONS: dict[tuple, _Orientations] = {}
+
+
+def _orientations_of(shape: Shape) -> _Orientations:
+    """
+    Returns the orientations of a shape, computing them the first time
+    a shape equal to it is seen.
+    """
+    key = (shape.kind, shape.origin, shape.can_be_transformed,
+           tuple(shape.squares))
+    orientations = _ORIENTATIONS.get(key)
+    if orientations is None:
+        orientations = _ORIENTATIONS[key] = _Orientations(shape)
+    return orientations
+
+
+# Orientation reached by each transformation from each orientation
+# (see _Orientations): rotations turn the rotation count, and a flip
+# also reverses it, since flipping after k right rotations is the same
+# as flipping first and rotating left k times
+_ROTATED_RIGHT = tuple((i // 4) * 4 + (i + 1) % 4 for i in range(8))
+_ROTATED_LEFT = tuple((i // 4) * 4 + (i - 1) % 4 for i in range(8))
+_FLIPPED = tuple((1 - i // 4) * 4 + (-i) % 4 for i in range(8))
+
+
 class Piece:
     """
     A Piece takes a Shape and orients it on the board.
 
     The anchor point is used to locate the Shape.
 
-    For flips and rotations, rather than storing these
-    orientations directly (for example, using two attributes
-    called face_up: bool and rotation: int), we modify
-    the shape attribute in place. Therefore, it is important
-    that each Piece object has its own deep copy of a
-    Shape, so that transforming one Piece does not affect
-    other Pieces that have the same Shape.
+    For flips and rotations, the piece only stores which of the
+    shape's eight orientations it is in: the squares of every
+    orientation are computed once per shape and shared by all the
+    pieces made from it (see _Orientations), so neither creating nor
+    transforming a piece copies or modifies the Shape it was given.
     """
 
-    shape: Shape
+    __slots__ = ("anchor", "_orientations", "_orientation", "_footprint",
+                 "_shape")
+
     anchor: Optional[Point]
+    _orientations: _Orientations
+    _orientation: int
+    _footprint: Optional[Footprint]
+    _shape: Optional[Shape]
 
     def __init__(self, shape: Shape, face_up: bool = True, rotation: int = 0):
         """
-        Each Piece will get its own deep copy of the given shape
-        subject to initial transformations according to the arguments:
+        Creates a piece of the given shape, in the orientation given by
+        the arguments:
 
-            face_up:  If true, the initial Shape will be flipped
+            face_up:  If false, the initial Shape will be flipped
                       horizontally.
             rotation: This number, modulo 4, indicates how many
                       times the shape should be right-rotated by
-                      90 degrees.
+                      90 degrees (after flipping).
         """
-        # Deep copy shape, so that it can be transformed in place
-        self.shape = copy.deepcopy(shape)
+        self._orientations = _orientations_of(shape)
+        self._orientation = (0 if face_up else 4) + rotation % 4
 
         # The anchor will be set by set_anchor
         self.anchor = None
 
-        # We choose to flip...
-        if not face_up:
-            self.shape.flip_horizontally()
+        # Computed on demand by footprint and shape, and reset whenever
+        # the anchor or orientation changes
+        self._footprint = None
+        self._shape = None
 
-        # ... before rotating
-        for _ in range(rotation % 4):
-            self.shape.rotate_right()
+    @property
+    def shape(self) -> Shape:
+        """
+        Returns the piece's shape in its current orientation. The Shape
+        is built the first time it is asked for after a change of
+        orientation, and belongs to this piece only; transforming it
+        does not transform the piece.
+        """
+        if self._shape is None:
+            orientations = self._orientations
+            self._shape = Shape(orientations.kind, orientations.origin,
+                                orientations.can_be_transformed,
+                                list(orientations.squares[self._orientation]))
+        return self._shape
 
     def set_anchor(self, anchor: Point) -> None:
         """
         Set the anchor point.
         """
         self.anchor = anchor
+        self._footprint = None
 
     def _check_anchor(self) -> None:
         """
@@ -204,28 +389,34 @@ class Piece:
         if self.anchor is None:
             raise ValueError(f"Piece does not have anchor: {self.shape}")
 
+    def _reorient(self, orientation: int) -> None:
+        """
+        Switches the piece to another of its orientations.
+        """
+        self._orientation = orientation
+        self._footprint = None
+        self._shape = None
+
     def flip_horizontally(self) -> None:
         """
         Flip the piece horizontally.
         """
         self._check_anchor()
-        self.shape.flip_horizontally()
+        self._reorient(_FLIPPED[self._orientation])
 
     def rotate_left(self) -> None:
         """
-        Rotate the shape left by 90 degrees,
-        by modifying the squares in place.
+        Rotate the shape left by 90 degrees.
         """
         self._check_anchor()
-        self.shape.rotate_left()
+        self._reorient(_ROTATED_LEFT[self._orientation])
 
     def rotate_right(self) -> None:
         """
-        Rotate the shape right by 90 degrees,
-        by modifying the squares in place.
+        Rotate the shape right by 90 degrees.
         """
         self._check_anchor()
-        self.shape.rotate_right()
+        self._reorient(_ROTATED_RIGHT[self._orientation])
 
     def squares(self) -> list[Point]:
         """
@@ -236,12 +427,24 @@ class Piece:
         """
         self._check_anchor()
         assert self.anchor is not None
-        return [
-            (row(self.anchor) + r, col(self.anchor) + c)
-            for r, c in self.shape.squares
-        ]
+        ar, ac = self.anchor
+        return [(ar + r, ac + c)
+                for r, c in self._orientations.squares[self._orientation]]
+
+
+    def footprint(self) -> Footprint:
+        """
+        Returns the squares, cardinal neighbors and intercardinal
+        neighbors of the piece. These are computed once for the current
+        anchor and orientation, and recomputed only after the piece has
+        been moved, flipped or rotated.
+
+        Raises ValueError if anchor is not set.
+        """
+        if self._footprint is None:
+            self._footprint = Footprint.of(self.squares())
+        return self._footprint
 
-    
     def cardinal_neighbors(self) -> set[Point]:
         """
         Returns the combined cardinal neighbors
@@ -252,16 +455,8 @@ class Piece:
         """
         if self.anchor == None:
             raise ValueError("There is no anchor for this shape")
-        cardinal_pieces = set()
-        for square in self.squares():
-            y, x = square
-            cardinal_pieces.add((max(y-1, 0), x))
-            cardinal_pieces.add((y, max( x - 1 , 0)))
-            cardinal_pieces.add((y, x+1))
-            cardinal_pieces.add((y+1,x))
-        
-        return set(filter(lambda x: x not in self.squares(), cardinal_pieces))
-    
+        return set(self.footprint().edges)
+
     def intercardinal_neighbors(self) -> set[Point]:
         '''
         Returns the combined intercardinal neighbors
@@ -272,18 +467,4 @@ class Piece:
         '''
         if self.anchor == None:
             raise ValueError("There is no anchor for this shape")
-        
-        diagnols = set()
-
-        for point in self.squares():
-            r, c = point
-            diagnol_pieces = {(r - 1, c - 1), (r + 1, c + 1), (r + 1, c - 1), (r - 1, c + 1)}
-            diagnols.update(diagnol_pieces)
-
-        not_in_squares = set(filter(lambda x: x not in self.squares(), diagnols))
-        
-        return set(filter(lambda x: x not in self.cardinal_neighbors(), not_in_squares))
-
-        
-            
-                
+        return set(self.footprint().corners)
@@ -0,0 +1,208 @@
+"""
+Binary game records
+
+A game record file holds any number of games of one configuration:
+
+    header      magic b"BLKR", format version (uint16), board size
+                (uint8), number of players (uint8), number of start
+                positions (uint8), then each start position as two
+                int16
+    games       for each game, its number of plies (uint16) followed by
+                one 3-byte move per ply: the orientation code (uint8,
+                see Move.code, or RETIRE_CODE for a retirement) and the
+                anchor's row and column (int8)
+    index       the offset in the file of each game (uint64)
+    trailer     the offset of the index (uint64), the number of games
+                (uint64), and the magic b"BLKE"
+
+All numbers are little-endian. GameRecordWriter writes the index and
+trailer when it is closed. GameRecordReader memory-maps a file and only
+reads the trailer when opened, so any game of a file holding millions
+of them can be read (or replayed into a Blokus) without parsing the
+others.
+"""
+
+import mmap
+import struct
+from typing import BinaryIO, Iterator, Optional
+
+from blokus import Blokus
+from move import Move, RETIRE_CODE
+from piece import Point
+
+FORMAT_VERSION = 1
+MAGIC = b"BLKR"
+END_MAGIC = b"BLKE"
+
+_HEADER = struct.Struct("<4sHBBB")
+_START = struct.Struct("<hh")
+_PLIES = struct.Struct("<H")
+_MOVE = struct.Struct("<Bbb")
+_OFFSET = struct.Struct("<Q")
+_TRAILER = struct.Struct("<QQ4s")
+
+
+class GameRecordWriter:
+    """
+    Writes games of one configuration to a game record file (see the
+    module docstring).
+    """
+
+    def __init__(self, path: str, size: int, num_players: int,
+                 start_positions: set[Point]) -> None:
+        """
+        Constructor
+
+        Raises ValueError if the configuration cannot be stored.
+        """
+        if not 0 < size < 128 or not 0 < num_players < 256 \
+                or len(start_positions) > 255:
+            raise ValueError("Invalid game configuration")
+        self.size = size
+        self.num_players = num_players
+        self.start_positions = set(start_positions)
+
+        self._file: BinaryIO = open(path, "wb")
+        self._file.write(_HEADER.pack(MAGIC, FORMAT_VERSION, size, num_players,
+                                      len(start_positions)))
+        for r, c in sorted(start_positions):
+            self._file.write(_START.pack(r, c))
+        self._offsets: list[int] = []
+
+    def write_game(self, moves: list[Optional[Move]]) -> None:
+        """
+        Writes a game, given as the moves played in order (None for a
+        retirement).
+        """
+        self._offsets.append(self._file.tell())
+        data = bytearray(_PLIES.pack(len(moves)))
+        for move in moves:
+            if move is None:
+                data += _MOVE.pack(RETIRE_CODE, 0, 0)
+            else:
+                data += _MOVE.pack(move.code, *move.anchor)
+        self._file.write(data)
+
+    def close(self) -> None:
+        """
+        Writes the index and trailer, and closes the file.
+        """
+        if self._file.closed:
+            return
+        index_offset = self._file.tell()
+        for offset in self._offsets:
+            self._file.write(_OFFSET.pack(offset))
+        self._file.write(_TRAILER.pack(index_offset, len(self._offsets),
+                                       END_MAGIC))
+        self._file.close()
+
+    def __enter__(self) -> "GameRecordWriter":
+        return self
+
+    def __exit__(self, *args: object) -> None:
+        self.close()
+
+
+class GameRecordReader:
+    """
+    Random access to the games of a game record file, through a memory
+    map of the file (see the module docstring).
+    """
+
+    def __init__(self, path: str) -> None:
+        """
+        Constructor
+
+        Raises ValueError if the file is not a complete game record file
+        of a supported version.
+        """
+        with open(path, "rb") as f:
+            try:
+                self._map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            except ValueError:
+                raise ValueError(f"{path} is empty") from None
+
+        try:
+            magic, version, size, num_players, num_starts = \
+                _HEADER.unpack_from(self._map, 0)
+            if magic != MAGIC:
+                raise ValueError(f"{path} is not a game record file")
+            if version != FORMAT_VERSION:
+                raise ValueError(f"Unsupported game record version {version}")
+            index_offset, num_games, end = _TRAILER.unpack_from(
+                self._map, len(self._map) - _TRAILER.size)
+            if end != END_MAGIC:
+                raise ValueError(f"{path} is incomplete")
+        except struct.error:
+            self._map.close()
+            raise ValueError(f"{path} is not a game record file") from None
+        except ValueError:
+            self._map.close()
+            raise
+
+        self.size: int = size
+        self.num_players: int = num_players
+        self.start_positions: set[Point] = {
+            _START.unpack_from(self._map, _HEADER.size + i * _START.size)
+            for i in range(num_starts)}
+        self._index_offset: int = index_offset
+        self._num_games: int = num_games
+
+    def __len__(self) -> int:
+        return self._num_games
+
+    def moves(self, index: int) -> list[Optional[Move]]:
+        """
+        Returns the moves of the game with the given index, in order
+        (None for a retirement).
+
+        Raises IndexError if there is no such game.
+        """
+        if not 0 <= index < self._num_games:
+            raise IndexError("Game index out of range")
+        offset, = _OFFSET.unpack_from(self._map,
+                                      self._index_offset + index * _OFFSET.size)
+        plies, = _PLIES.unpack_from(self._map, offset)
+        return [None if code == RETIRE_CODE else Move.from_code(code, (r, c))
+                for code, r, c in _MOVE.iter_unpack(
+                    self._map[offset + _PLIES.size:
+                              offset + _PLIES.size + plies * _MOVE.size])]
+
+    def replay(self, index: int, bulk: bool = False) -> Blokus:
+        """
+        Replays the game with the given index into a new Blokus.
+
+        By default, every move is placed as a Piece with maybe_place,
+        as the TUI and GUI do. In bulk mode, the moves are played with
+        make_move instead, which does not build any Piece.
+
+        Raises ValueError if one of the moves is not legal.
+        """
+        game = Blokus(self.num_players, self.size, set(self.start_positions))
+        for move in self.moves(index):
+            if bulk:
+                played = game.make_move(move)
+            elif move is None:
+                game.retire()
+                played = True
+            else:
+                played = game.maybe_place(move.to_piece())
+            if not played:
+                raise ValueError(f"Illegal move {move} in game {index}")
+        return game
+
+    def __iter__(self) -> Iterator[list[Optional[Move]]]:
+        for index in range(self._num_games):
+            yield self.moves(index)
+
+    def close(self) -> None:
+        """
+        Releases the memory map.
+        """
+        self._map.close()
+
+    def __enter__(self) -> "GameRecordReader":
+        return self
+
+    def __exit__(self, *args: object) -> None:
+        self.close()
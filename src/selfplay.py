@@ -0,0 +1,419 @@
+"""
+Self-play data generation
+
+Bots play games against each other in worker processes, and every ply
+of every game is written as one fixed-width binary record to rotating
+shard files, for training position evaluators. A record holds:
+
+    planes      one bitplane per player of the cells they occupy
+                (bit r * size + c, ceil(size * size / 8) bytes each,
+                little-endian), before the move
+    remaining   one uint32 per player, with bit i set if the player
+                still has the shape KINDS[i] (see orientations.py):
+                the player's Blokus.inventory
+    player      uint8, the player to move
+    move        uint8 orientation code (an index into
+                ORIENTATION_LIST, or RETIRE_CODE for a retirement; see
+                Move.code),
+                followed by the anchor's row and column as int8
+    result      one int8 per player, their final score
+
+Records are buffered one game at a time (the result is only known once
+the game is over), so memory use does not grow with the number of
+games. Shards are named shard-00000.bin (shard-00000.bin.gz when
+compressed), and an index.json file describes the record layout, the
+game configuration and the shards written so far. It is rewritten every
+time a shard is completed, so the shards of an interrupted run can
+still be read.
+"""
+
+from collections import deque
+from concurrent.futures import Future, ProcessPoolExecutor
+import gzip
+import io
+import json
+import os
+import random
+import struct
+from typing import Callable, Iterator, Optional
+
+import click
+
+from blokus import Blokus
+from bot import BaseBot, NBot, SBot, UBot, ABBot, game_rng
+from move import Move, RETIRE_CODE
+from piece import Point
+
+FORMAT_VERSION = 1
+INDEX_FILE = "index.json"
+
+
+def record_struct(size: int, num_players: int) -> struct.Struct:
+    """
+    Returns the layout of the records of games with the given board size
+    and number of players (see the module docstring).
+    """
+    plane_bytes = (size * size + 7) // 8
+    return struct.Struct(f"<{plane_bytes * num_players}s{num_players}I"
+                         f"BBbb{num_players}b")
+
+
+class PositionRecord:
+    """
+    One decoded ply of a self-play game (see the module docstring)
+    """
+
+    __slots__ = ("planes", "remaining", "player", "move", "result")
+
+    def __init__(self, planes: list[int], remaining: list[int], player: int,
+                 move: Optional[Move], result: list[int]) -> None:
+        self.planes = planes
+        self.remaining = remaining
+        self.player = player
+        self.move = move
+        self.result = result
+
+    def occupant(self, size: int, r: int, c: int) -> Optional[int]:
+        """
+        Returns the player occupying the cell (r, c), or None.
+        """
+        for i, plane in enumerate(self.planes):
+            if plane >> (r * size + c) & 1:
+                return i + 1
+        return None
+
+
+def encode_position(game: Blokus) -> tuple[bytes, list[int]]:
+    """
+    Returns the bitplanes and remaining-piece masks of a game's position.
+    """
+    size = game.size
+    planes = [0] * game.num_players
+    for r, row in enumerate(game.grid):
+        for c, cell in enumerate(row):
+            if cell is not None:
+                planes[cell[0] - 1] |= 1 << (r * size + c)
+    plane_bytes = (size * size + 7) // 8
+    data = b"".join(plane.to_bytes(plane_bytes, "little") for plane in planes)
+
+    remaining = [game.inventory(player)
+                 for player in range(1, game.num_players + 1)]
+    return data, remaining
+
+
+def encode_move(move: Optional[Move]) -> tuple[int, int, int]:
+    """
+    Returns the orientation code and anchor of a move, as stored in a
+    record. Retirements (None) are stored as RETIRE_CODE.
+    """
+    if move is None:
+        return RETIRE_CODE, 0, 0
+    r, c = move.anchor
+    return move.code, r, c
+
+
+def decode_move(code: int, r: int, c: int) -> Optional[Move]:
+    """
+    Returns the move stored as the given orientation code and anchor.
+    """
+    if code == RETIRE_CODE:
+        return None
+    return Move.from_code(code, (r, c))
+
+
+def record_game(bots: list[BaseBot], seed: int, index: int, size: int,
+                start_positions: set[Point]) -> bytes:
+    """
+    Plays one game between the bots, seeded from the master seed and the
+    game's index as in BaseBot.play_games, and returns its records.
+
+    Raises ValueError if a bot proposes an illegal move.
+    """
+    for player, bot in enumerate(bots, 1):
+        bot.rng = game_rng(seed, index, player)
+    game = Blokus(len(bots), size, set(start_positions))
+    layout = record_struct(size, len(bots))
+
+    plies = []
+    while not game.game_over:
+        planes, remaining = encode_position(game)
+        player = game.curr_player
+        piece = bots[player - 1].make_move(game)
+        move = Move.from_piece(piece) if piece else None
+        if not game.make_move(move):
+            raise ValueError(f"Illegal move {move} in game {index}")
+        plies.append((planes, remaining, player, encode_move(move)))
+
+    result = [game.get_score(p) for p in range(1, game.num_players + 1)]
+    return b"".join(layout.pack(planes, *remaining, player, *move, *result)
+                    for planes, remaining, player, move in plies)
+
+
+def _record_games(bots: list[BaseBot], seed: int, first_game: int,
+                  num_games: int, size: int,
+                  start_positions: set[Point]) -> list[bytes]:
+    """
+    Plays a batch of games in a worker process (see self_play)
+    """
+    return [record_game(bots, seed, index, size, start_positions)
+            for index in range(first_game, first_game + num_games)]
+
+
+class ShardWriter:
+    """
+    Writes records to rotating shard files in a directory, and keeps
+    its index.json up to date (see the module docstring).
+    """
+
+    def __init__(self, directory: str, size: int, num_players: int,
+                 start_positions: set[Point], records_per_shard: int = 100_000,
+                 compress: bool = False) -> None:
+        """
+        Constructor
+
+        Raises ValueError if records_per_shard is not positive, or if
+        the directory already holds shards.
+        """
+        if records_per_shard <= 0:
+            raise ValueError("Invalid number of records per shard")
+        os.makedirs(directory, exist_ok=True)
+        if os.path.exists(os.path.join(directory, INDEX_FILE)):
+            raise ValueError(f"{directory} already holds self-play data")
+
+        self.directory = directory
+        self.records_per_shard = records_per_shard
+        self.compress = compress
+        self.layout = record_struct(size, num_players)
+        self.index: dict = {
+            "version": FORMAT_VERSION,
+            "size": size,
+            "num_players": num_players,
+            "start_positions": [list(pos) for pos in sorted(start_positions)],
+            "record_format": self.layout.format,
+            "record_size": self.layout.size,
+            "compressed": compress,
+            "shards": [],
+        }
+        # The shard being written, and its number of records and games
+        # A plain or gzip file, both buffered binary files
+        self._file: Optional[io.BufferedIOBase] = None
+        self._name = ""
+        self._records = 0
+        self._games = 0
+
+    def write_game(self, records: bytes) -> None:
+        """
+        Writes the records of one game. A game may be split across
+        shards; it is counted in the games of the shard it starts in.
+        """
+        size = self.layout.size
+        if len(records) % size:
+            raise ValueError("Truncated record")
+        offset = 0
+        while offset < len(records):
+            if self._file is None:
+                self._open()
+            assert self._file is not None
+            if offset == 0:
+                self._games += 1
+            count = min(self.records_per_shard - self._records,
+                        (len(records) - offset) // size)
+            self._file.write(records[offset:offset + count * size])
+            self._records += count
+            offset += count * size
+            if self._records == self.records_per_shard:
+                self._close_shard()
+
+    def close(self) -> None:
+        """
+        Completes the last shard and writes the index.
+        """
+        if self._file is not None:
+            self._close_shard()
+        self._write_index()
+
+    def __enter__(self) -> "ShardWriter":
+        return self
+
+    def __exit__(self, *args: object) -> None:
+        self.close()
+
+    def _open(self) -> None:
+        """
+        Starts the next shard
+        """
+        name = f"shard-{len(self.index['shards']):05d}.bin"
+        if self.compress:
+            name += ".gz"
+        path = os.path.join(self.directory, name)
+        self._file = gzip.open(path, "wb") if self.compress else open(path, "wb")
+        self._name = name
+        self._records = 0
+        self._games = 0
+
+    def _close_shard(self) -> None:
+        """
+        Completes the current shard and adds it to the index
+        """
+        assert self._file is not None
+        self._file.close()
+        self._file = None
+        self.index["shards"].append({"file": self._name,
+                                     "records": self._records,
+                                     "games": self._games})
+        self._write_index()
+
+    def _write_index(self) -> None:
+        """
+        Writes the index, replacing the previous one in one step
+        """
+        path = os.path.join(self.directory, INDEX_FILE)
+        with open(path + ".tmp", "w") as f:
+            json.dump(self.index, f, indent=2)
+        os.replace(path + ".tmp", path)
+
+
+def read_index(directory: str) -> dict:
+    """
+    Returns the index of a directory of shards.
+
+    Raises ValueError if it was written by another version of the format.
+    """
+    with open(os.path.join(directory, INDEX_FILE)) as f:
+        index = json.load(f)
+    if index["version"] != FORMAT_VERSION:
+        raise ValueError(f"Unsupported self-play format {index['version']}")
+    return index
+
+
+def iter_records(directory: str) -> Iterator[PositionRecord]:
+    """
+    Yields every record of a directory of shards, in order, reading
+    one record at a time.
+    """
+    index = read_index(directory)
+    layout = struct.Struct(index["record_format"])
+    num_players = index["num_players"]
+    plane_bytes = (index["size"] ** 2 + 7) // 8
+
+    for shard in index["shards"]:
+        path = os.path.join(directory, shard["file"])
+        opener = gzip.open if index["compressed"] else open
+        with opener(path, "rb") as f:
+            for _ in range(shard["records"]):
+                fields = layout.unpack(f.read(layout.size))
+                planes = [int.from_bytes(fields[0][i * plane_bytes:
+                                                   (i + 1) * plane_bytes],
+                                         "little")
+                          for i in range(num_players)]
+                remaining = list(fields[1:1 + num_players])
+                player, code, r, c = fields[1 + num_players:5 + num_players]
+                yield PositionRecord(planes, remaining, player,
+                                     decode_move(code, r, c),
+                                     list(fields[5 + num_players:]))
+
+
+def self_play(bots: list[BaseBot], num_games: int, directory: str,
+              workers: int = 1, seed: Optional[int] = None, size: int = 11,
+              start_positions: Optional[set[Point]] = None,
+              records_per_shard: int = 100_000,
+              compress: bool = False) -> dict:
+    """
+    Plays games between the bots (one per player) and writes every ply
+    to shards in the directory.
+
+    Games are played in batches by a pool of worker processes, with at
+    most two batches per worker in flight, and written in the order of
+    their indices, so the output only depends on the seed and memory
+    use stays flat no matter how many games are played.
+
+    Inputs:
+        bots (list[BaseBot]): The bots, in the order they play
+        num_games (int): The number of games to play
+        directory (str): The directory to write the shards to
+        workers (int): The number of worker processes
+        seed (Optional[int]): The master seed of the games
+            (a random one if None)
+        size (int): The board size
+        start_positions (Optional[set[Point]]): The start positions
+            (opposite corners of the board by default)
+        records_per_shard (int): The number of records of each shard
+        compress (bool): Whether to gzip the shards
+
+    Returns:
+        dict: The index of the shards
+    """
+    if seed is None:
+        seed = random.randrange(2 ** 32)
+    if start_positions is None:
+        corners = [(0, 0), (size - 1, size - 1), (0, size - 1), (size - 1, 0)]
+        start_positions = set(corners[:len(bots)])
+    writer = ShardWriter(directory, size, len(bots), start_positions,
+                         records_per_shard, compress)
+
+    batch_size = 4
+    with writer:
+        if workers <= 1:
+            for index in range(num_games):
+                writer.write_game(record_game(bots, seed, index, size,
+                                              start_positions))
+            return writer.index
+
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            pending: deque[Future] = deque()
+            for first in range(0, num_games, batch_size):
+                count = min(batch_size, num_games - first)
+                pending.append(pool.submit(_record_games, bots, seed, first,
+                                           count, size, start_positions))
+                if len(pending) >= 2 * workers:
+                    for records in pending.popleft().result():
+                        writer.write_game(records)
+            while pending:
+                for records in pending.popleft().result():
+                    writer.write_game(records)
+    return writer.index
+
+
+@click.command()
+@click.option('-n', '--num-games', default=100, type=int, \
+help='Number of games to play.')
+@click.option('-1', '--player1', default='N', \
+type=click.Choice(['S', 'N', 'U', 'A']), help='Strategy for player 1.')
+@click.option('-2', '--player2', default='N', \
+type=click.Choice(['S', 'N', 'U', 'A']), help='Strategy for player 2.')
+@click.option('-o', '--output', default='selfplay', type=str, \
+help='Directory to write the shards to.')
+@click.option('-w', '--workers', default=1, type=int, \
+help='Number of worker processes to play the games in.')
+@click.option('--seed', default=None, type=int, \
+help='Master seed of the games (random if not given).')
+@click.option('-t', '--move-time', default=0.1, type=float, \
+help='Time budget, in seconds, of each move of the search bot (A).')
+@click.option('--shard-size', default=100_000, type=int, \
+help='Number of records per shard.')
+@click.option('--compress', is_flag=True, \
+help='Compress the shards with gzip.')
+
+def main(num_games: int, player1: str, player2: str, output: str,
+         workers: int, seed: Optional[int], move_time: float,
+         shard_size: int, compress: bool) -> None:
+    """
+    Run to generate self-play data
+    """
+    strategies: dict[str, Callable[[int], BaseBot]] = {'N': NBot, 'S': SBot,
+                                                       'U': UBot}
+    bots: list[BaseBot] = []
+    for bot_id, strategy in ((1, player1), (2, player2)):
+        if strategy == 'A':
+            bots.append(ABBot(bot_id=bot_id, move_time=move_time))
+        else:
+            bots.append(strategies[strategy](bot_id))
+
+    index = self_play(bots, num_games, output, workers, seed,
+                      records_per_shard=shard_size, compress=compress)
+    records = sum(shard["records"] for shard in index["shards"])
+    print(f"Wrote {records} records of {num_games} games to "
+          f"{len(index['shards'])} shards in {output}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,188 @@
+"""
+Zobrist hashing of Blokus positions, and a transposition table.
+
+A position's key is the XOR of one random 64-bit number for every
+(cell, player) pair of occupied cells, for every shape each player has
+already played, for every retired player, and for the player to move.
+Placing a piece or retiring only changes a few of these terms, so the
+engine can update the key incrementally (see Blokus.key), and positions
+reached through different move orders get the same key.
+
+The random numbers come from a fixed seed, so keys are the same in
+every process.
+"""
+
+import random
+from typing import Optional
+
+from shape_definitions import ShapeKind
+from move import Move
+from base import BlokusBase
+
+
+class ZobristKeys:
+    """
+    The random numbers used to hash positions of a game with num_players
+    players on a (size x size) board. Players are numbered from 1, as in
+    the game; index 0 is unused.
+
+        cells[player][r * size + c]: player occupies cell (r, c)
+        shapes[player][kind]: player has played the shape kind
+        retired[player]: player has retired
+        turn[player]: player is to move
+    """
+
+    _cache: dict[tuple[int, int], "ZobristKeys"] = {}
+
+    def __init__(self, size: int, num_players: int) -> None:
+        """
+        Constructor. Use ZobristKeys.for_game to share the keys of
+        games of the same size and number of players.
+        """
+        rng = random.Random(f"zobrist:{size}:{num_players}")
+        players = range(num_players + 1)
+        self.cells: list[list[int]] = [
+            [rng.getrandbits(64) for _ in range(size * size)] for _ in players]
+        self.shapes: list[dict[ShapeKind, int]] = [
+            {kind: rng.getrandbits(64) for kind in ShapeKind} for _ in players]
+        self.retired: list[int] = [rng.getrandbits(64) for _ in players]
+        self.turn: list[int] = [rng.getrandbits(64) for _ in players]
+
+    @staticmethod
+    def for_game(size: int, num_players: int) -> "ZobristKeys":
+        """
+        Returns the keys of games with the given board size and number
+        of players, generating them the first time they are requested.
+        """
+        if (size, num_players) not in ZobristKeys._cache:
+            ZobristKeys._cache[(size, num_players)] = ZobristKeys(size, num_players)
+        return ZobristKeys._cache[(size, num_players)]
+
+
+def position_key(game: BlokusBase, used_shapes: dict[int, list[ShapeKind]]) -> int:
+    """
+    Computes the key of a game's position from scratch, from its grid,
+    the shapes each player has used, its retired players and the player
+    to move. The engine maintains the same key incrementally; this is
+    meant for checking it.
+    """
+    keys = ZobristKeys.for_game(game.size, game.num_players)
+    key = keys.turn[game.curr_player]
+    for r, row in enumerate(game.grid):
+        for c, cell in enumerate(row):
+            if cell is not None:
+                key ^= keys.cells[cell[0]][r * game.size + c]
+    for player, kinds in used_shapes.items():
+        for kind in kinds:
+            key ^= keys.shapes[player][kind]
+    for player in game.retired_players:
+        key ^= keys.retired[player]
+    return key
+
+
+# Kinds of bounds stored in a transposition table entry
+EXACT = 0
+LOWER = 1
+UPPER = 2
+
+
+class TableEntry:
+    """
+    What a search learned about a position: the depth it was searched
+    to, its value (exact, or a lower or upper bound), and the best move
+    found, if any.
+    """
+
+    __slots__ = ("key", "depth", "value", "bound", "move", "generation")
+
+    def __init__(self, key: int, depth: int, value: float, bound: int,
+                 move: Optional[Move], generation: int) -> None:
+        self.key = key
+        self.depth = depth
+        self.value = value
+        self.bound = bound
+        self.move = move
+        self.generation = generation
+
+
+class TranspositionTable:
+    """
+    A fixed-size table of search results indexed by Zobrist key.
+
+    Each key maps to one slot (key modulo the capacity). When two
+    positions compete for a slot, the new entry replaces the old one if
+    it was searched at least as deep, or if the old entry was stored
+    during an earlier search (see new_search), so that stale results
+    do not hold on to the table forever.
+
+    The hits, misses, stores and replacements counters are kept for
+    tuning the table size.
+    """
+
+    def __init__(self, capacity: int = 1 << 16) -> None:
+        """
+        Constructor
+
+        Raises ValueError if the capacity is not positive.
+        """
+        if capacity <= 0:
+            raise ValueError("Invalid transposition table capacity")
+        self.capacity = capacity
+        self._slots: list[Optional[TableEntry]] = [None] * capacity
+        self._generation = 0
+        self.hits = 0
+        self.misses = 0
+        self.stores = 0
+        self.replacements = 0
+
+    def __len__(self) -> int:
+        return sum(1 for entry in self._slots if entry is not None)
+
+    @property
+    def hit_rate(self) -> float:
+        """
+        Returns the fraction of probes that found their position
+        """
+        probes = self.hits + self.misses
+        return self.hits / probes if probes else 0.0
+
+    def new_search(self) -> None:
+        """
+        Marks the start of a new search: entries stored before it can
+        be replaced by any new entry.
+        """
+        self._generation += 1
+
+    def probe(self, key: int) -> Optional[TableEntry]:
+        """
+        Returns the entry of the position with the given key, if any
+        """
+        entry = self._slots[key % self.capacity]
+        if entry is not None and entry.key == key:
+            self.hits += 1
+            return entry
+        self.misses += 1
+        return None
+
+    def store(self, key: int, depth: int, value: float, bound: int,
+              move: Optional[Move]) -> None:
+        """
+        Stores what a search learned about a position, subject to the
+        replacement policy described above
+        """
+        index = key % self.capacity
+        old = self._slots[index]
+        if old is not None and old.key != key:
+            if old.depth > depth and old.generation == self._generation:
+                return
+            self.replacements += 1
+        self._slots[index] = TableEntry(key, depth, value, bound, move,
+                                        self._generation)
+        self.stores += 1
+
+    def clear(self) -> None:
+        """
+        Empties the table and resets its statistics
+        """
+        self._slots = [None] * self.capacity
+        self.hits = self.misses = self.stores = self.replacements = 0
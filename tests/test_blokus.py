@@ -2,6 +2,23 @@
 CMSC 14200 Blokus Proj.
 Dear God I'm so tired :(
 """
+import json
+import random
+import zlib
+from pathlib import Path
+
+import pytest
+
+from shape_definitions import ShapeKind
+from piece import Point, Shape, Piece, shape_registry
+from blokus import Blokus, SHAPE_BITS, SQUARE_COUNTS
+from bitboard import BlokusBitboard
+from move import Move
+from zobrist import position_key, TranspositionTable, EXACT, LOWER
+from records import GameRecordWriter, GameRecordReader
+from orientations import (ORIENTATIONS, SYMMETRIES, TRANSFORMS,
+                          NUM_ORIENTATIONS, KINDS, normalize)
+
 
 def test_inheritance(self):
     """
@@ -114,4 +131,694 @@ def test_two_player_blokus_mini_game(self):
     values of game_over and curr_player are correct. After game over, verify the values
     of game_over, winners, get_score(1), and get_score(2).
     """
-    raise NotImplementedError
\ No newline at end of file
+    raise NotImplementedError
+
+
+def brute_force_moves(blokus: Blokus) -> set[tuple[ShapeKind, frozenset[Point]]]:
+    """
+    Computes the legal moves of the current player by trying every
+    remaining shape, in all eight flips and rotations, at every anchor
+    of the board.
+    """
+    moves = set()
+    for kind in blokus.remaining_shapes(blokus.curr_player):
+        for face_up, rotation in TRANSFORMS:
+            piece = Piece(blokus.shapes[kind], face_up, rotation)
+            for r in range(blokus.size):
+                for c in range(blokus.size):
+                    piece.set_anchor((r, c))
+                    if blokus.legal_to_place(piece):
+                        moves.add((kind, frozenset(piece.squares())))
+    return moves
+
+
+def as_footprints(pieces: set[Piece]) -> set[tuple[ShapeKind, frozenset[Point]]]:
+    return {(piece.shape.kind, frozenset(piece.squares())) for piece in pieces}
+
+
+def test_available_moves_match_brute_force() -> None:
+    """
+    Play a seeded random 2-player game on a small board and check that
+    the corner-anchored move generator agrees with a full board scan.
+    """
+    rng = random.Random(142)
+    blokus = Blokus(2, 9, {(2, 2), (6, 6)})
+
+    for _ in range(8):
+        moves = blokus.available_moves()
+        assert as_footprints(moves) == brute_force_moves(blokus)
+        if not moves:
+            blokus.retire()
+            continue
+        assert blokus.maybe_place(rng.choice(list(moves)))
+
+
+
+def test_orientation_table() -> None:
+    """
+    Test that the orientation table holds the 91 distinct orientations
+    of the 21 shapes, collapsing the symmetric ones.
+    """
+    assert NUM_ORIENTATIONS == 91
+    assert len(ORIENTATIONS[ShapeKind.ONE]) == 1
+    assert len(ORIENTATIONS[ShapeKind.LETTER_O]) == 1
+    assert len(ORIENTATIONS[ShapeKind.X]) == 1
+    assert len(ORIENTATIONS[ShapeKind.TWO]) == 2
+    assert len(ORIENTATIONS[ShapeKind.F]) == 8
+
+    blokus = Blokus(2, 14, {(4, 4), (9, 9)})
+    for kind, orientations in ORIENTATIONS.items():
+        assert len({normalize(o) for o in orientations}) == len(orientations)
+        for (face_up, rotation), offsets in zip(TRANSFORMS, SYMMETRIES[kind]):
+            piece = Piece(blokus.shapes[kind], face_up, rotation)
+            piece.set_anchor((0, 0))
+            assert tuple(sorted(piece.squares())) == offsets
+
+
+def test_bitboard_engine_matches_blokus() -> None:
+    """
+    Play the same seeded random game on Blokus and BlokusBitboard, and
+    check that the two engines agree on moves, grid, and scores.
+    """
+    rng = random.Random(7)
+    blokus = Blokus(2, 14, {(4, 4), (9, 9)})
+    bitboard = BlokusBitboard(2, 14, {(4, 4), (9, 9)})
+
+    while not blokus.game_over:
+        assert not bitboard.game_over
+        assert bitboard.curr_player == blokus.curr_player
+        moves = blokus.available_moves()
+        assert as_footprints(bitboard.available_moves()) == as_footprints(moves)
+        if not moves:
+            blokus.retire()
+            bitboard.retire()
+            continue
+        move = rng.choice(sorted(moves, key=lambda p: sorted(p.squares())))
+        assert bitboard.legal_to_place(move)
+        assert blokus.maybe_place(move)
+        assert bitboard.maybe_place(move)
+        assert bitboard.grid == blokus.grid
+
+    assert bitboard.game_over
+    assert bitboard.winners == blokus.winners
+    for player in (1, 2):
+        assert bitboard.get_score(player) == blokus.get_score(player)
+
+
+def test_move_value_semantics() -> None:
+    """
+    Test that Moves compare and hash by value, cannot be modified, and
+    convert to and from Pieces covering the same squares.
+    """
+    blokus = Blokus(2, 14, {(4, 4), (9, 9)})
+
+    move = Move(ShapeKind.F, 3, (4, 4))
+    assert move == Move(ShapeKind.F, 3, (4, 4))
+    assert move != Move(ShapeKind.F, 2, (4, 4))
+    assert len({move, Move(ShapeKind.F, 3, (4, 4))}) == 1
+    with pytest.raises(AttributeError):
+        move.anchor = (5, 5)  # type: ignore
+    with pytest.raises(ValueError):
+        Move(ShapeKind.X, 1, (4, 4))
+
+    piece = move.to_piece(blokus.shapes[ShapeKind.F])
+    assert sorted(piece.squares()) == sorted(move.squares())
+    assert Move.from_piece(piece) == move
+
+    for face_up, rotation in TRANSFORMS:
+        piece = Piece(blokus.shapes[ShapeKind.LETTER_O], face_up, rotation)
+        piece.set_anchor((6, 6))
+        move = Move.from_piece(piece)
+        assert sorted(move.squares()) == sorted(piece.squares())
+
+    moves = blokus.legal_moves()
+    assert as_footprints(blokus.available_moves()) == \
+        {(m.kind, frozenset(m.squares())) for m in moves}
+
+
+def test_piece_footprint() -> None:
+    """
+    Test that a piece's footprint is computed once, agrees with the
+    neighbor methods, and is recomputed after the piece is moved or
+    transformed.
+    """
+    blokus = Blokus(2, 14, {(4, 4), (9, 9)})
+    piece = Piece(blokus.shapes[ShapeKind.C])
+    piece.set_anchor((5, 5))
+
+    footprint = piece.footprint()
+    assert footprint is piece.footprint()
+    assert footprint.squares == {(5, 5), (5, 6), (6, 5)}
+    assert footprint.edges == piece.cardinal_neighbors() == \
+        {(4, 5), (4, 6), (5, 4), (5, 7), (6, 4), (6, 6), (7, 5)}
+    assert footprint.corners == piece.intercardinal_neighbors() == \
+        {(4, 4), (4, 7), (6, 7), (7, 4), (7, 6)}
+
+    piece.rotate_right()
+    assert piece.footprint() is not footprint
+    assert piece.footprint().squares == frozenset(piece.squares())
+
+    footprint = piece.footprint()
+    piece.set_anchor((7, 7))
+    assert piece.footprint().squares == frozenset(piece.squares())
+
+
+def test_game_over_counters() -> None:
+    """
+    Test that game_over follows retirements and placements through the
+    engine's counters.
+    """
+    blokus = Blokus(2, 5, {(0, 0), (4, 4)})
+    assert not blokus.game_over
+    assert blokus.active_players == {1, 2}
+
+    piece = Piece(blokus.shapes[ShapeKind.LETTER_O])
+    piece.set_anchor((0, 0))
+    assert blokus.maybe_place(piece)
+    assert blokus.fllled_board
+    assert not blokus.all_pieces_played
+
+    blokus.retire()
+    assert blokus.active_players == {1}
+    assert not blokus.game_over
+
+    blokus.retire()
+    assert blokus.active_players == set()
+    assert blokus.game_over
+
+
+def snapshot(blokus: Blokus) -> tuple:
+    """
+    Returns a copy of the observable state of a game.
+    """
+    players = range(1, blokus.num_players + 1)
+    return ([row[:] for row in blokus.grid], blokus.curr_player,
+            blokus.num_moves, set(blokus.retired_players),
+            set(blokus.active_players), blokus.game_over,
+            list(blokus.winners),
+            {p: blokus.get_score(p) for p in players},
+            {p: list(blokus.remaining_shapes(p)) for p in players},
+            {p: set(blokus.corners(p)) for p in players},
+            sorted(blokus.legal_moves()))
+
+
+def test_make_unmake_move() -> None:
+    """
+    Play a seeded random game with make_move, checking that every move
+    (including retirements) can be taken back and played again, and
+    that taking back the whole game restores the initial position.
+    """
+    rng = random.Random(11)
+    blokus = Blokus(3, 10, {(0, 0), (9, 9), (0, 9)})
+    initial = snapshot(blokus)
+
+    made = 0
+    while not blokus.game_over:
+        before = snapshot(blokus)
+        moves = sorted(blokus.legal_moves())
+        move = rng.choice(moves) if moves else None
+        assert blokus.make_move(move)
+        after = snapshot(blokus)
+
+        blokus.unmake_move()
+        assert snapshot(blokus) == before
+        blokus.redo_move()
+        assert snapshot(blokus) == after
+        made += 1
+
+    for _ in range(made):
+        blokus.unmake_move()
+    assert snapshot(blokus) == initial
+    with pytest.raises(ValueError):
+        blokus.unmake_move()
+
+
+def test_unmake_repeated_retirement() -> None:
+    """
+    Test that taking back the retirement of a player who had already
+    retired leaves them retired, and restores the position's key.
+    """
+    blokus = Blokus(4, 14, {(0, 0), (13, 13), (0, 13), (13, 0)})
+    assert blokus.make_move(None)
+    for _ in range(2):
+        assert blokus.make_move(min(blokus.legal_moves()))
+    assert blokus.make_move(None)
+    # The turn passes to player 1, who has already retired
+    assert blokus.curr_player == 1
+    assert blokus.retired_players == {1, 4}
+    before = snapshot(blokus)
+
+    assert blokus.make_move(None)
+    blokus.unmake_move()
+    assert snapshot(blokus) == before
+    assert blokus.retired_players == {1, 4}
+    assert blokus.active_players == {2, 3}
+    assert blokus.key == position_key(blokus, blokus.player_used_shapes)
+
+
+def test_random_move_is_legal() -> None:
+    """
+    Test that random_move only returns legal moves, and returns None
+    exactly when the current player has no legal move.
+    """
+    rng = random.Random(5)
+    blokus = Blokus(2, 9, {(2, 2), (6, 6)})
+
+    while not blokus.game_over:
+        move = blokus.random_move(rng, tries=4)
+        if move is None:
+            assert not blokus.legal_moves()
+        else:
+            assert move in blokus.legal_moves()
+        assert blokus.make_move(move)
+
+
+def test_zobrist_keys() -> None:
+    """
+    Test that the incremental key always matches the key computed from
+    scratch, that taking a move back restores the key, and that the
+    same position reached in a different order has the same key.
+    """
+    rng = random.Random(3)
+    blokus = Blokus(2, 9, {(2, 2), (6, 6)})
+    while not blokus.game_over:
+        before = blokus.key
+        moves = sorted(blokus.legal_moves())
+        blokus.make_move(rng.choice(moves) if moves else None)
+        assert blokus.key == position_key(blokus, blokus.player_used_shapes)
+        blokus.unmake_move()
+        assert blokus.key == before
+        blokus.redo_move()
+
+    def play(order: list[tuple[ShapeKind, Point]]) -> Blokus:
+        game = Blokus(2, 9, {(2, 2), (6, 6)})
+        for kind, cell in order:
+            move = min(m for m in game.legal_moves()
+                       if m.kind == kind and cell in m.squares())
+            assert game.make_move(move)
+        return game
+
+    # Player 1 plays TWO and THREE off opposite corners of its first
+    # piece, in either order
+    one = play([(ShapeKind.ONE, (2, 2)), (ShapeKind.ONE, (6, 6)),
+                (ShapeKind.TWO, (1, 1)), (ShapeKind.TWO, (7, 7)),
+                (ShapeKind.THREE, (3, 3))])
+    other = play([(ShapeKind.ONE, (2, 2)), (ShapeKind.ONE, (6, 6)),
+                  (ShapeKind.THREE, (3, 3)), (ShapeKind.TWO, (7, 7)),
+                  (ShapeKind.TWO, (1, 1))])
+    assert one.grid == other.grid
+    assert one.key == other.key
+    assert one.key != play([(ShapeKind.ONE, (2, 2))]).key
+
+
+def test_transposition_table() -> None:
+    """
+    Test storing and probing entries, the replacement policy, and the
+    statistics of a transposition table.
+    """
+    with pytest.raises(ValueError):
+        TranspositionTable(0)
+
+    table = TranspositionTable(4)
+    move = Move(ShapeKind.ONE, 0, (0, 0))
+    assert table.probe(1) is None
+    table.store(1, 3, 2.5, EXACT, move)
+    entry = table.probe(1)
+    assert entry is not None
+    assert (entry.depth, entry.value, entry.bound, entry.move) \
+        == (3, 2.5, EXACT, move)
+
+    # Key 5 maps to the same slot: a shallower entry of the same search
+    # does not replace a deeper one, but a deeper one does
+    table.store(5, 1, 0.0, LOWER, None)
+    assert table.probe(5) is None
+    table.store(5, 4, 1.0, LOWER, None)
+    assert table.probe(1) is None
+    assert table.probe(5) is not None
+
+    # Entries from an earlier search are always replaced
+    table.new_search()
+    table.store(1, 1, 0.0, EXACT, None)
+    assert table.probe(1) is not None
+
+    assert len(table) == 1
+    assert (table.hits, table.misses) == (3, 3)
+    assert table.stores == 3
+    assert table.replacements == 2
+    assert table.hit_rate == 0.5
+    table.clear()
+    assert len(table) == 0 and table.hit_rate == 0.0
+
+
+def test_legal_anchor_masks() -> None:
+    """
+    Test that the NumPy legality masks agree with legal_to_place for
+    every position of every orientation, over a seeded random game.
+    """
+    pytest.importorskip("numpy")
+    from numpy_masks import anchor_of, masks_to_moves
+
+    rng = random.Random(9)
+    blokus = Blokus(2, 9, {(2, 2), (6, 6)})
+    step = 0
+    while not blokus.game_over:
+        masks = blokus.legal_anchor_masks()
+        assert set(masks) == set(blokus.remaining_shapes(blokus.curr_player))
+        assert masks_to_moves(masks) == blokus.legal_moves()
+
+        if step % 4 == 0:
+            for kind, by_orientation in masks.items():
+                for j, mask in enumerate(by_orientation):
+                    assert mask.shape == (9, 9)
+                    for r in range(9):
+                        for c in range(9):
+                            move = Move(kind, j, anchor_of(kind, j, (r, c)))
+                            piece = move.to_piece(blokus.shapes[kind])
+                            assert bool(mask[r, c]) \
+                                == blokus.legal_to_place(piece)
+
+        moves = sorted(blokus.legal_moves())
+        blokus.make_move(rng.choice(moves) if moves else None)
+        step += 1
+
+
+def test_batch_matches_blokus() -> None:
+    """
+    Test that a batch of seeded random games reaches, at every step, the
+    same positions, legal moves and scores as the same games replayed on
+    Blokus instances.
+    """
+    pytest.importorskip("numpy")
+    from batch import BlokusBatch, RETIRE
+
+    starts = {(0, 0), (8, 8), (0, 8)}
+    batch = BlokusBatch(4, 3, 9, starts)
+    games = [Blokus(3, 9, set(starts)) for _ in range(4)]
+    rng = random.Random(4)
+
+    while not batch.done.all():
+        masks = batch.legal_masks()
+        for g, game in enumerate(games):
+            assert batch.done[g] == game.game_over
+            if game.game_over:
+                continue
+            moves = {batch.to_move(action)
+                     for action in masks[g].reshape(-1).nonzero()[0]}
+            assert moves == game.legal_moves()
+            assert batch.curr_player[g] == game.curr_player
+
+        actions = batch.sample_moves(rng)
+        batch.step(actions)
+        for g, game in enumerate(games):
+            if not game.game_over:
+                assert game.make_move(batch.to_move(actions[g]))
+            grid = [[cell[0] if cell else 0 for cell in row]
+                    for row in game.grid]
+            assert batch.boards[g].tolist() == grid
+            assert [game.get_score(p) for p in range(1, 4)] \
+                == batch.scores[g, 1:].tolist()
+
+    for g, game in enumerate(games):
+        assert batch.winners(g) == game.winners
+
+    with pytest.raises(ValueError):
+        BlokusBatch(0, 3, 9, starts)
+    batch = BlokusBatch(1, 3, 9, starts)
+    with pytest.raises(ValueError):
+        batch.step([5])
+    assert not batch.step([RETIRE])[0]
+
+
+def test_game_records(tmp_path: Path) -> None:
+    """
+    Test writing seeded random games to a game record file, reading
+    them back in any order, and replaying them.
+    """
+    starts = {(0, 0), (8, 8), (0, 8)}
+    rng = random.Random(8)
+    games = []
+    for _ in range(5):
+        blokus = Blokus(3, 9, set(starts))
+        moves = []
+        while not blokus.game_over:
+            move = blokus.random_move(rng)
+            blokus.make_move(move)
+            moves.append(move)
+        games.append((moves, snapshot(blokus)))
+
+    path = str(tmp_path / "games.blkr")
+    with GameRecordWriter(path, 9, 3, starts) as writer:
+        for moves, _ in games:
+            writer.write_game(moves)
+
+    with GameRecordReader(path) as reader:
+        assert len(reader) == 5
+        assert (reader.size, reader.num_players) == (9, 3)
+        assert reader.start_positions == starts
+        for index in (3, 0, 4, 1, 2):
+            moves, final = games[index]
+            assert reader.moves(index) == moves
+            assert snapshot(reader.replay(index)) == final
+            assert snapshot(reader.replay(index, bulk=True)) == final
+        assert list(reader) == [moves for moves, _ in games]
+        with pytest.raises(IndexError):
+            reader.moves(5)
+
+    truncated = tmp_path / "truncated.blkr"
+    truncated.write_bytes((tmp_path / "games.blkr").read_bytes()[:-4])
+    with pytest.raises(ValueError):
+        GameRecordReader(str(truncated))
+    (tmp_path / "empty.blkr").write_bytes(b"")
+    with pytest.raises(ValueError):
+        GameRecordReader(str(tmp_path / "empty.blkr"))
+
+
+def test_snapshots() -> None:
+    """
+    Test that binary and JSON snapshots restore the same position, at
+    every step of a seeded random game with retirements.
+    """
+    rng = random.Random(6)
+    starts = {(0, 0), (13, 13), (0, 13), (13, 0)}
+    blokus = Blokus(4, 14, set(starts))
+    while not blokus.game_over:
+        data = blokus.to_bytes()
+        assert len(data) < 400
+        for restored in (Blokus.from_bytes(data),
+                         Blokus.from_json(blokus.to_json())):
+            assert snapshot(restored) == snapshot(blokus)
+            assert restored.key == blokus.key
+            assert restored.start_positions == starts
+        blokus.make_move(blokus.random_move(rng, tries=2))
+        assert blokus.key == position_key(blokus, blokus.player_used_shapes)
+
+    with pytest.raises(ValueError):
+        Blokus.from_bytes(b"BLKS")
+    with pytest.raises(ValueError):
+        Blokus.from_bytes(blokus.to_bytes()[:-3])
+    with pytest.raises(ValueError):
+        Blokus.from_json("{}")
+
+    # A cell held by a player the game does not have
+    fresh = Blokus(2, 14, {(4, 4), (9, 9)})
+    data = fresh.to_bytes()
+    header = data[:len(data) - len(zlib.compress(bytes(14 * 14)))]
+    with pytest.raises(ValueError):
+        Blokus.from_bytes(header + zlib.compress(bytes([3 * 32]) + bytes(14 * 14 - 1)))
+    state = json.loads(fresh.to_json())
+    state["grid"][0][0] = [3, "ONE"]
+    with pytest.raises(ValueError):
+        Blokus.from_json(json.dumps(state))
+
+    # Fields of the wrong shape or type
+    for field, value in (("grid", [[""] * 14] * 14), ("num_players", -1),
+                         ("used_shapes", None)):
+        state = json.loads(fresh.to_json())
+        state[field] = value
+        with pytest.raises(ValueError):
+            Blokus.from_json(json.dumps(state))
+
+
+def test_piece_transforms_match_shape_transforms() -> None:
+    """
+    Test that flipping and rotating a piece gives the same squares, in
+    the same order, as transforming a copy of its shape in place, and
+    that the shape the piece was made from is left untouched.
+    """
+    rng = random.Random(2)
+    blokus = Blokus(2, 14, {(4, 4), (9, 9)})
+    for kind, shape in blokus.shapes.items():
+        original = list(shape.squares)
+        for face_up, rotation in TRANSFORMS:
+            piece = Piece(shape, face_up, rotation)
+            piece.set_anchor((7, 7))
+            reference = Shape(shape.kind, shape.origin,
+                              shape.can_be_transformed, list(shape.squares))
+            if not face_up:
+                reference.flip_horizontally()
+            for _ in range(rotation):
+                reference.rotate_right()
+
+            for _ in range(12):
+                name = rng.choice(["flip_horizontally", "rotate_left",
+                                   "rotate_right"])
+                getattr(piece, name)()
+                getattr(reference, name)()
+                assert piece.shape.squares == reference.squares
+                assert piece.shape.kind == kind
+                assert piece.squares() == [(7 + r, 7 + c)
+                                           for r, c in reference.squares]
+        assert shape.squares == original
+
+
+def test_shape_registry_is_shared_and_frozen() -> None:
+    """
+    Test that the shared shape registry cannot be transformed in place,
+    while each game's shapes can be, without affecting other games or
+    the moves the engine finds.
+    """
+    shape = shape_registry()[ShapeKind.L]
+    for transform in (shape.flip_horizontally, shape.rotate_left,
+                      shape.rotate_right):
+        with pytest.raises(ValueError):
+            transform()
+
+    for engine in (Blokus, BlokusBitboard):
+        first = engine(2, 14, {(4, 4), (9, 9)})
+        second = engine(2, 14, {(4, 4), (9, 9)})
+        assert first.shapes is first.shapes
+        assert first.shapes is not second.shapes
+        moves = as_footprints(first.available_moves())
+
+        for kind in (ShapeKind.L, ShapeKind.S, ShapeKind.Y):
+            original = list(first.shapes[kind].squares)
+            first.shapes[kind].flip_horizontally()
+            assert first.shapes[kind].squares == [(-r, c) for r, c in original]
+            first.shapes[kind].rotate_left()
+            first.shapes[kind].rotate_right()
+            assert second.shapes[kind].squares == original
+            assert shape_registry()[kind].squares == original
+        assert as_footprints(first.available_moves()) == moves
+
+
+def test_piece_inventory() -> None:
+    """
+    Test that each player's inventory bitmask tracks the shapes they
+    have left through a seeded random game, and that the dicts of the
+    players' shapes are not shared with each other.
+    """
+    rng = random.Random(4)
+    blokus = Blokus(2, 14, {(4, 4), (9, 9)})
+    shapes = blokus.player_shapes_dict
+    assert shapes[1] is not shapes[2]
+    assert list(shapes[1]) == list(blokus.shapes)
+    # They are the game's own shapes, which can be transformed
+    assert blokus.curr_player_shapes[ShapeKind.L] is blokus.shapes[ShapeKind.L]
+    assert shapes[2][ShapeKind.L] is blokus.shapes[ShapeKind.L]
+    blokus.curr_player_shapes[ShapeKind.L].rotate_right()
+
+    while not blokus.game_over:
+        for player in (1, 2):
+            used = blokus.player_used_shapes[player]
+            remaining = [kind for kind in blokus.shapes if kind not in used]
+            assert blokus.remaining_shapes(player) == remaining
+            assert blokus.num_remaining(player) == len(remaining)
+            assert blokus.inventory(player) == sum(SHAPE_BITS[kind]
+                                                   for kind in remaining)
+            # The same encoding as self-play records and the batch engine
+            assert blokus.inventory(player) == sum(
+                1 << i for i, kind in enumerate(KINDS) if kind not in used)
+            assert all(blokus.has_shape(player, kind) == (kind not in used)
+                       for kind in blokus.shapes)
+            assert list(blokus.player_shapes_dict[player]) == remaining
+            if remaining:
+                assert blokus.get_score(player) == \
+                    -sum(SQUARE_COUNTS[kind] for kind in remaining)
+        used = blokus.player_used_shapes[blokus.curr_player]
+        if used:
+            with pytest.raises(ValueError):
+                blokus.make_move(Move(used[-1], 0, (0, 0)))
+        blokus.make_move(blokus.random_move(rng, tries=2))
+    assert not blokus.all_pieces_played
+
+
+def test_count_moves() -> None:
+    """
+    Test that the move counts of every player, not only the current
+    one, match the legal moves found by legal_moves and by the NumPy
+    masks, over a seeded random game.
+    """
+    pytest.importorskip("numpy")
+    from numpy_masks import legal_anchor_masks
+
+    rng = random.Random(12)
+    blokus = Blokus(3, 11, {(0, 0), (10, 10), (0, 10)})
+    while not blokus.game_over:
+        moves = blokus.legal_moves()
+        assert blokus.count_moves() == len(moves)
+        for player in range(1, 4):
+            masks = legal_anchor_masks(blokus, player)
+            by_shape = blokus.count_moves_by_shape(player)
+            assert by_shape == {kind: sum(int(mask.sum()) for mask in masks[kind])
+                                for kind in masks}
+            assert blokus.count_moves(player) == sum(by_shape.values())
+        blokus.make_move(rng.choice(sorted(moves)) if moves else None)
+
+
+def test_has_legal_move_and_auto_retire() -> None:
+    """
+    Test that has_legal_move agrees with count_moves for every player,
+    and that in auto-retire mode maybe_place never leaves a stuck
+    player to move, over seeded random games.
+    """
+    rng = random.Random(8)
+    starts = {(0, 0), (10, 10), (0, 10)}
+    blokus = Blokus(3, 11, set(starts), auto_retire=True)
+    while not blokus.game_over:
+        for player in range(1, 4):
+            assert blokus.has_legal_move(player) == \
+                (blokus.count_moves(player) > 0)
+        assert blokus.curr_player not in blokus.retired_players
+        assert blokus.has_legal_move()
+
+        move = rng.choice(sorted(blokus.legal_moves()))
+        assert blokus.maybe_place(move.to_piece(blokus.shapes[move.kind]))
+
+    assert all(blokus.count_moves(player) == 0
+               for player in blokus.retired_players)
+    assert not Blokus(3, 11, set(starts)).auto_retire
+
+
+def test_iter_available_moves() -> None:
+    """
+    Test that every order of iter_available_moves yields each legal move
+    exactly once, in the promised order, over a seeded random game, and
+    that the first move of a random order is uniformly drawn.
+    """
+    rng = random.Random(10)
+    blokus = Blokus(2, 11, {(3, 3), (7, 7)})
+    checked_uniform = False
+    while not blokus.game_over:
+        legal = blokus.legal_moves()
+        for order in ("largest", "corner", "random"):
+            moves = list(blokus.iter_available_moves(order, rng))
+            assert len(moves) == len(legal) and set(moves) == legal
+
+        sizes = [len(move.offsets) for move in
+                 blokus.iter_available_moves("largest")]
+        assert sizes == sorted(sizes, reverse=True)
+
+        if 5 <= len(legal) <= 30 and not checked_uniform:
+            checked_uniform = True
+            counts = {move: 0 for move in legal}
+            for _ in range(200 * len(legal)):
+                counts[next(blokus.iter_available_moves("random", rng))] += 1
+            assert 100 < min(counts.values()) <= max(counts.values()) < 300
+
+        blokus.make_move(rng.choice(sorted(legal)) if legal else None)
+    assert checked_uniform
+
+    with pytest.raises(ValueError):
+        blokus.iter_available_moves("random")
+    with pytest.raises(ValueError):
+        blokus.iter_available_moves("smallest")
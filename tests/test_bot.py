@@ -0,0 +1,130 @@
+"""
+Tests for the Blokus bots and the game driver
+"""
+from pathlib import Path
+
+import pytest
+
+pytest.importorskip("click")
+
+from blokus import Blokus
+from piece import Piece
+from bot import ABBot, MCTSBot, NBot, SBot, mcts_search
+
+
+class CrashingBot(NBot):
+    """
+    A random bot that crashes after a number of moves
+    """
+
+    def __init__(self, bot_id: int, moves: int) -> None:
+        super().__init__(bot_id)
+        self.moves = moves
+
+    def make_move(self, game: Blokus) -> Piece | None:
+        self.moves -= 1
+        if self.moves < 0:
+            raise RuntimeError("crash")
+        return super().make_move(game)
+
+
+def test_seeded_games_are_reproducible() -> None:
+    """
+    Test that a seeded batch of games gives the same results whether it
+    is played in this process or spread over several workers.
+    """
+    serial = NBot(bot_id=1).play_game(NBot(bot_id=2), 6, workers=1, seed=14200)
+    parallel = NBot(bot_id=1).play_game(NBot(bot_id=2), 6, workers=3, seed=14200)
+
+    assert serial == parallel
+    assert sum(serial) == 6
+
+
+def test_smart_bot_beats_random_bot() -> None:
+    """
+    Test that SBot, which plays the largest of its sampled moves,
+    usually beats the random NBot.
+    """
+    wins, losses, _ = SBot(bot_id=1).play_game(NBot(bot_id=2), 6, seed=7)
+    assert wins > losses
+
+
+def test_search_bot_plays_legal_moves_and_beats_random_bot() -> None:
+    """
+    Test that the alpha-beta bot only proposes legal moves, respects its
+    depth limit, reports its search speed, and beats the random NBot.
+    """
+    bot = ABBot(bot_id=1, move_time=5.0, max_depth=1)
+    game = Blokus(2, 11, {(0, 0), (10, 10)})
+    piece = bot.make_move(game)
+    assert piece is not None and game.legal_to_place(piece)
+    assert bot.last_depth == 1
+    assert bot.nodes > 0 and bot.nodes_per_second > 0
+
+    wins, losses, _ = bot.play_game(NBot(bot_id=2), 2, seed=3)
+    assert wins > losses
+
+
+def test_mcts_bot_plays_legal_moves() -> None:
+    """
+    Test that the MCTS search leaves the game unmodified, spreads its
+    playouts over the root moves, and that the bot proposes legal moves.
+    """
+    game = Blokus(2, 11, {(0, 0), (10, 10)})
+    stats = mcts_search(game, simulations=30, move_time=30.0, seed=1,
+                        max_children=5)
+    assert len(stats) == 5
+    assert sum(visits for visits, _ in stats.values()) == 30
+    assert game.num_moves == 0 and game.legal_moves()
+
+    bot = MCTSBot(bot_id=1, simulations=20, move_time=30.0)
+    piece = bot.make_move(game)
+    assert piece is not None and game.legal_to_place(piece)
+
+
+def test_mcts_bot_with_workers_closes_its_pool() -> None:
+    """
+    Test that the root-parallel MCTS bot proposes legal moves, and that
+    its worker processes are shut down when it is closed, and when
+    play_games is done with it.
+    """
+    game = Blokus(2, 11, {(0, 0), (10, 10)})
+    bot = MCTSBot(bot_id=1, simulations=20, move_time=30.0, workers=2)
+    with bot:
+        piece = bot.make_move(game)
+        assert piece is not None and game.legal_to_place(piece)
+        assert game.num_moves == 0
+        assert bot._pool is not None
+    assert bot._pool is None
+
+    bot = MCTSBot(bot_id=1, simulations=4, move_time=30.0, workers=2)
+    wins, losses, ties = bot.play_games(NBot(bot_id=2), 1, seed=5)
+    assert wins + losses + ties == 1
+    assert bot._pool is None
+
+
+@pytest.mark.parametrize("workers, moves", [(1, 30), (2, 8)])
+def test_checkpointed_games_resume_after_crash(tmp_path: Path, workers: int,
+                                               moves: int) -> None:
+    """
+    Test that games interrupted by a crash, and resumed from their
+    checkpoint, give the same results as games played in one go. Every
+    worker gets its own copy of the crashing bot, so they crash sooner.
+    """
+    expected = NBot(bot_id=1).play_game(NBot(bot_id=2), 4, seed=21)
+
+    path = str(tmp_path / "games.json")
+    bot = CrashingBot(bot_id=1, moves=moves)
+    bot.checkpoint_interval = 0.0
+    with pytest.raises(RuntimeError):
+        bot.play_game(NBot(bot_id=2), 4, workers=workers, seed=21,
+                      checkpoint=path)
+
+    # The seed comes from the checkpoint
+    resumed = NBot(bot_id=1).play_game(NBot(bot_id=2), 4, workers=workers,
+                                       checkpoint=path)
+    assert resumed == expected
+
+    with pytest.raises(ValueError):
+        NBot(bot_id=1).play_game(NBot(bot_id=2), 4, workers=workers,
+                                 seed=22, checkpoint=path)
@@ -0,0 +1,75 @@
+from pathlib import Path
+
+import pytest
+
+pytest.importorskip("click")
+
+from blokus import Blokus
+from bot import BaseBot, NBot
+from piece import Piece
+from selfplay import self_play, iter_records, read_index, encode_position, ShardWriter, \
+    record_game
+from shape_definitions import ShapeKind
+
+
+def test_self_play_records_replay(tmp_path: Path) -> None:
+    """
+    Test that the records of a seeded self-play run replay into the
+    same positions, and that they do not depend on the number of
+    workers or on compression.
+    """
+    directory = str(tmp_path / "one")
+    index = self_play([NBot(1), NBot(2)], 6, directory, seed=3, size=9,
+                      records_per_shard=25)
+    assert all(shard["records"] == 25 for shard in index["shards"][:-1])
+    assert sum(shard["games"] for shard in index["shards"]) == 6
+    assert read_index(directory) == index
+
+    records = list(iter_records(directory))
+    assert len(records) == sum(shard["records"] for shard in index["shards"])
+
+    games = 0
+    game = None
+    for record in records:
+        if game is None or game.game_over:
+            game = Blokus(2, 9, {(0, 0), (8, 8)})
+            games += 1
+        planes, remaining = encode_position(game)
+        assert [int.from_bytes(planes[i * 11:(i + 1) * 11], "little")
+                for i in range(2)] == record.planes
+        assert remaining == record.remaining
+        assert record.player == game.curr_player
+        assert game.make_move(record.move)
+        if game.game_over:
+            assert record.result == [game.get_score(1), game.get_score(2)]
+    assert games == 6 and game is not None and game.game_over
+
+    compressed = str(tmp_path / "two")
+    self_play([NBot(1), NBot(2)], 6, compressed, workers=2, seed=3, size=9,
+              records_per_shard=25, compress=True)
+    other = list(iter_records(compressed))
+    assert [(r.planes, r.remaining, r.player, r.move, r.result)
+            for r in other] \
+        == [(r.planes, r.remaining, r.player, r.move, r.result)
+            for r in records]
+
+    with pytest.raises(ValueError):
+        ShardWriter(directory, 9, 2, {(0, 0), (8, 8)})
+
+
+class CenterBot(BaseBot):
+    """
+    A bot that always proposes the monomino in the middle of the board
+    """
+    def make_move(self, game: Blokus) -> Piece | None:
+        piece = Piece(game.shapes[ShapeKind.ONE])
+        piece.set_anchor((game.size // 2, game.size // 2))
+        return piece
+
+
+def test_record_game_rejects_illegal_moves() -> None:
+    """
+    Test that a game is not recorded with a move that was never played.
+    """
+    with pytest.raises(ValueError):
+        record_game([CenterBot(1), NBot(2)], 3, 0, 9, {(0, 0), (8, 8)})